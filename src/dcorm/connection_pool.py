@@ -1,43 +1,180 @@
 from __future__ import annotations
-from dcorm.types import Connection, ConnectionFactory
+from collections import deque
+import threading
+from typing import Any, Callable, Iterable
+
+from dcorm.types import Connection, ConnectionFactory, Cursor
+
+# Pragmas applied to every connection the pool creates.  WAL mode lets readers
+# proceed while a write is in progress, and busy_timeout makes a connection
+# wait for a lock instead of failing immediately with SQLITE_BUSY.  Each
+# connection's page cache is limited to 64MB; callers that want more can pass
+# their own pragmas to the pool.  Temporary tables and indices are kept in
+# memory, and up to 256MB of the database file is memory mapped.  In-memory
+# databases ignore the journal and mmap pragmas.
+DEFAULT_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "busy_timeout=5000",
+    "cache_size=-64000",
+    "foreign_keys=ON",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+)
 
 
 class ConnectionContextMgr:
+    """
+    Checkout of a pooled connection.  It may be entered again while it's
+    already in use, e.g. by operations that are part of a transaction.  Only
+    the outermost exit commits or rolls back and returns the connection to
+    the pool.
+    """
+
     _connection: Connection
     _pool: ConnectionPool
+    _readonly: bool
+    _home: deque[Connection]
+    _depth: int
+    _cursor: Cursor | None
+    # Called, most recent first, if the checkout's changes are rolled back
+    _undo: list[tuple[Callable[..., Any], tuple[Any, ...]]]
 
-    def __init__(self, connection: Connection, pool: ConnectionPool):
+    def __init__(
+        self,
+        connection: Connection,
+        pool: ConnectionPool,
+        readonly: bool,
+        home: deque[Connection],
+    ):
         self._connection = connection
         self._pool = pool
+        self._readonly = readonly
+        # The pool the connection is returned to
+        self._home = home
+        self._depth = 0
+        self._cursor = None
+        self._undo = []
 
     def __enter__(self) -> Connection:
+        self._depth += 1
         return self._connection
 
+    def cursor(self) -> Cursor:
+        # A cursor shared by the operations in this checkout.  It's only for
+        # statements whose results are read before the next statement runs;
+        # streamed queries need a cursor of their own.  sqlite3 already keeps
+        # each connection's prepared statements, keyed by their SQL.  Rows
+        # are read by position, so they're plain tuples whatever the
+        # connection's row_factory is.
+        if self._cursor is None:
+            self._cursor = self._connection.cursor()
+            self._cursor.row_factory = None
+        return self._cursor
+
+    def on_rollback(self, callback: Callable[..., Any], *args: Any):
+        """
+        Register a function that undoes an in-memory change made along with
+        the checkout's changes to the database.  It's called with `args` if
+        those changes are rolled back, or if committing them fails.
+        """
+        self._undo.append((callback, args))
+
     def __exit__(self, exc_type, exc_value, traceback):
-        if exc_type is None:
-            self._connection.commit()
-        else:
-            self._connection.rollback()
+        self._depth -= 1
+        if self._depth > 0:
+            return
 
-        self._pool.release(self._connection)
+        undo, self._undo = self._undo, []
+        committed = False
+        try:
+            # Nothing was written on a readonly checkout, so there's nothing
+            # to commit.
+            if exc_type is None:
+                if not self._readonly:
+                    self._connection.commit()
+                committed = True
+            else:
+                self._connection.rollback()
+        finally:
+            self._pool.release(self._connection, self._home)
+            if not committed:
+                for callback, args in reversed(undo):
+                    callback(*args)
 
 
 class ConnectionPool:
+    """
+    Pool of `size` connections split into a write pool of one connection and
+    a read pool of `size - 1` connections.  Readonly checkouts take reader
+    connections, so they don't compete with writes for the writer.  When the
+    preferred pool is empty, a connection is borrowed from the other one
+    before a new connection is created, and each connection goes back to the
+    pool it came from.  Writes are not serialized by the pool: a borrowed
+    reader can write, and SQLite's lock (with busy_timeout) orders them.
+    """
+
     _connection_factory: ConnectionFactory
-    _pool: list[Connection]
+    _write_pool: deque[Connection]
+    _read_pool: deque[Connection]
+    _read_size: int
+    _pragmas: tuple[str, ...]
+    _lock: threading.Lock
 
-    def __init__(self, connection_factory, size=16):
+    # Only one connection at a time can write to a SQLite database.
+    _write_size = 1
+
+    def __init__(
+        self,
+        connection_factory,
+        size=16,
+        pragmas: Iterable[str] = DEFAULT_PRAGMAS,
+    ):
         self._size = size
+        self._read_size = max(size - self._write_size, 0)
         self._connection_factory = connection_factory
-        self._pool = [connection_factory() for _ in range(size)]
+        self._pragmas = tuple(pragmas)
+        self._lock = threading.Lock()
+        self._write_pool = deque(
+            self._new_connection() for _ in range(min(size, self._write_size))
+        )
+        self._read_pool = deque(self._new_connection() for _ in range(self._read_size))
 
-    def use(self) -> ConnectionContextMgr:
-        try:
-            connection = self._pool.pop()
-        except IndexError:
-            connection = self._connection_factory()
-        return ConnectionContextMgr(connection, self)
-
-    def release(self, connection: Connection):
-        if len(self._pool) < self._size:
-            self._pool.append(connection)
+    def use(self, readonly: bool = False) -> ConnectionContextMgr:
+        preferred, other = self._pools(readonly)
+        home = preferred
+        connection = None
+        with self._lock:
+            if preferred:
+                connection = preferred.pop()
+            elif other:
+                home = other
+                connection = other.pop()
+
+        if connection is None:
+            connection = self._new_connection()
+        return ConnectionContextMgr(connection, self, readonly, home)
+
+    def release(self, connection: Connection, home: deque[Connection]):
+        # Connections created because both pools were empty are dropped
+        # once their pool is full again.
+        with self._lock:
+            if len(home) < self._capacity(home):
+                home.append(connection)
+
+    def _pools(self, readonly: bool) -> tuple[deque[Connection], deque[Connection]]:
+        if readonly:
+            return self._read_pool, self._write_pool
+        else:
+            return self._write_pool, self._read_pool
+
+    def _capacity(self, pool: deque[Connection]) -> int:
+        return self._read_size if pool is self._read_pool else self._write_size
+
+    def _new_connection(self) -> Connection:
+        connection = self._connection_factory()
+        if self._pragmas:
+            cursor = connection.cursor()
+            for pragma in self._pragmas:
+                cursor.execute(f"PRAGMA {pragma}")
+        return connection
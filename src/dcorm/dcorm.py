@@ -1,10 +1,27 @@
 from __future__ import annotations
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+import contextvars
 import dataclasses
 import datetime as dt
+import functools
+import itertools
+import operator
 import sqlite3
+import sys
+import threading
 from types import NoneType, UnionType
-from typing import Any, Iterator, Tuple, get_type_hints, get_args
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Tuple,
+    cast,
+    get_type_hints,
+    get_args,
+)
+import weakref
 
 import cattr
 
@@ -14,10 +31,15 @@ from dcorm.converters import register_converters
 register_converters()
 
 
-from dcorm.connection_pool import ConnectionPool, ConnectionContextMgr
+from dcorm.connection_pool import (
+    DEFAULT_PRAGMAS,
+    ConnectionPool,
+    ConnectionContextMgr,
+)
 from dcorm.types import (
     Connection,
     ConnectionFactory,
+    Cursor,
     DataClass,
     DataClassType,
     Field,
@@ -28,66 +50,214 @@ from dcorm.types import (
 )
 
 SELF_ROW_ID = "__self__row_id__"
+DCORM_STATE = "_dcorm_state"
+DCORM_OWNER = "__dcorm_owner__"
+DCORM_TABLE = "__dcorm_table__"
+DCORM_FIELDS = "__dcorm_fields__"
+DCORM_SQL = "__dcorm_sql__"
 SQLITE_ROWID = "_rowid_"
+DCORM_MATCHED = "__dcorm_matched__"
+# INSERT ... RETURNING is supported starting with SQLite 3.35.
+SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35)
 
 # The SQLite datatypes are NULL, INTEGER, REAL, TEXT, and BLOB
 # The SQLite "affinities" are TEXT, NUMERIC, INTEGER, REAL, and BLOB
 # SQLite will resort to NUMERIC automatically for values that can't be sotred
 # as REAL or INTEGER, so we use REAL or INTEGER here and let the db use NUMERIC
-# when appropriate.  Dates and timestamps are stored in Unix epoch format
-
-SQLITE_TYPE: dict[type, str] = defaultdict(lambda: "BLOB")
-SQLITE_TYPE.update(
-    {
-        int: "INTEGER",
-        float: "REAL",
-        str: "TEXT",
-        dt.date: "TEXT",
-        dt.datetime: "TEXT",
-    }
-)
+# when appropriate.  Dates are stored as their proleptic Gregorian ordinal,
+# date.toordinal(), and timestamps as microseconds since the Unix epoch.
+
+SQLITE_TYPE: dict[type, str] = {
+    int: "INTEGER",
+    float: "REAL",
+    str: "TEXT",
+    dt.date: "INTEGER",
+    dt.datetime: "INTEGER",
+}
+# Types not listed above are stored as BLOB.
+SQLITE_DEFAULT_TYPE = "BLOB"
+_sql_type = SQLITE_TYPE.get
 
 UTC = dt.timezone.utc
+EPOCH = dt.datetime(1970, 1, 1, tzinfo=UTC)
+_MICROSECOND = dt.timedelta(microseconds=1)
+
+# Number of rows fetched from the cursor at a time when streaming results.
+# The first batch is smaller so that the first rows are available without
+# stepping through a whole batch, e.g. when only the first result is used.
+FETCH_BATCH_SIZE = 1000
+FIRST_FETCH_BATCH_SIZE = 64
+
+# Types that sqlite3 already returns in their native Python form.  Values for
+# fields of these types are passed through without involving cattrs.
+NATIVE_SQLITE_TYPES = (int, float, str)
+
+# Shared placeholder for the lists on a Select that haven't been appended to
+# yet.  Many Selects are executed without joins or where clauses, so the
+# lists are only allocated when they're first needed.
+_EMPTY: Any = ()
+
+# A referred to instance read by the same query as the instance referring to
+# it: the name of the foreign key field, the slice of the row holding the
+# referred to instance's columns, and the row builder for its class.
+AttachedReference = Tuple[str, int, int, Callable[[Iterable[tuple]], Iterator[Any]]]
+
+
+def _passthrough(value: Any, _: type) -> Any:
+    return value
+
+
+# Dates are stored as their proleptic Gregorian ordinal and timestamps as
+# microseconds since the Unix epoch.  Both are plain integers to sqlite3, so
+# nothing has to be formatted or parsed as text.
+# Timestamps are read back with the fixed local offset from astimezone().
+
+
+def _structure_date(value: int, _: type) -> dt.date:
+    return dt.date.fromordinal(value)
+
+
+def _structure_datetime(value: int, _: type) -> dt.datetime:
+    # After loading, convert to localtime by calling astimezone() with no arguments.
+    return (EPOCH + value * _MICROSECOND).astimezone()
+
+
+def _unstructure_date(value: dt.date) -> int:
+    return value.toordinal()
+
+
+def _unstructure_datetime(value: dt.datetime) -> int:
+    # Naive values are taken to be localtime, so call astimezone() with no
+    # arguments to add the timezone.  Aware values can be subtracted from the
+    # epoch as is.  The difference is exact in microseconds.
+    if value.utcoffset() is None:
+        value = value.astimezone()
+    return (value - EPOCH) // _MICROSECOND
+
+
+# The converter that every ORM's sql_converter starts from.
+_DEFAULT_CONVERTER = cattr.Converter()
+_DEFAULT_CONVERTER.register_structure_hook(dt.date, _structure_date)
+_DEFAULT_CONVERTER.register_structure_hook(dt.datetime, _structure_datetime)
+_DEFAULT_CONVERTER.register_unstructure_hook(dt.date, _unstructure_date)
+_DEFAULT_CONVERTER.register_unstructure_hook(dt.datetime, _unstructure_datetime)
 
 
 class ORM:
     sql_converter: cattr.Converter
-    registered_classes: dict[type, dict[str, object]]
+    registered_classes: dict[type, dict[str, Any]]
     known_objects: WeakKeyDict
+    # The live instances that were stored in or read from the current
+    # database, keyed by class and rowid.  It's shared by every connection and
+    # transaction of the ORM, so get_by_id() and references can return an
+    # instance with unsaved changes, or one whose row another connection has
+    # changed since.  get_by_id(refresh=True) reads the row regardless.
+    identity_map: weakref.WeakValueDictionary[tuple[type, KeyType], Any]
+    _connection_factory: ConnectionFactory | None
+    _pragmas: tuple[str, ...]
+    # The connection of the transaction() the current thread or task is in
+    _transaction: contextvars.ContextVar[ConnectionContextMgr | None]
+    _pool_lock: threading.Lock
 
     def __init__(self):
-        self.sql_converter = cattr.Converter()
-        self.sql_converter.register_structure_hook(
-            dt.date, lambda v, _: dt.date.fromisoformat(v)
-        )
-        self.sql_converter.register_structure_hook(
-            # After loading, convert to localtime by calling astimezone() with no arguments.
-            dt.datetime,
-            lambda v, _: dt.datetime.fromisoformat(v).astimezone(),
-        )
-        self.sql_converter.register_unstructure_hook(dt.date, lambda d: d.isoformat())
-
-        # Call astimezone() with no arguments to add the timezone if it's
-        # missing, otherwise it converts to localtime.  Then convert to UTC.
-        self.sql_converter.register_unstructure_hook(
-            dt.datetime,
-            lambda d: d.astimezone().astimezone(UTC).isoformat(),
-        )
+        # Each ORM gets its own copy because registering a class adds hooks.
+        self.sql_converter = _DEFAULT_CONVERTER.copy()
 
         self.registered_classes = {}
         self.known_objects = WeakKeyDict()
-
-    def set_connection_factory(self, connection_factory: ConnectionFactory):
-        self.__CONNECTION_POOL__ = ConnectionPool(connection_factory)
+        self.identity_map = weakref.WeakValueDictionary()
+        self._connection_factory = None
+        self._pragmas = DEFAULT_PRAGMAS
+        self._transaction = contextvars.ContextVar("dcorm_transaction", default=None)
+        self._pool_lock = threading.Lock()
+        self.__CONNECTION_POOL__: ConnectionPool | None = None
+
+    def set_connection_factory(
+        self,
+        connection_factory: ConnectionFactory,
+        pragmas: Iterable[str] = DEFAULT_PRAGMAS,
+    ):
+        # The remembered instances belong to the previous database.
+        self.identity_map = weakref.WeakValueDictionary()
+        # The pool is only created when it's first used, so replacing a
+        # factory that was never used doesn't open any connections.
+        self._connection_factory = connection_factory
+        self._pragmas = tuple(pragmas)
+        self.__CONNECTION_POOL__ = None
 
     def connection_context(
         self,
         connection: ConnectionContextMgr | None = None,
+        readonly: bool = False,
     ) -> ConnectionContextMgr:
+        # Operations that aren't given a connection inside transaction() use
+        # the transaction's connection.
         if connection is None:
-            connection = self.__CONNECTION_POOL__.use()
+            connection = self._transaction.get()
+        if connection is None:
+            pool = self.__CONNECTION_POOL__
+            if pool is None:
+                pool = self._create_pool()
+            connection = pool.use(readonly)
         return connection
 
+    def _create_pool(self) -> ConnectionPool:
+        with self._pool_lock:
+            if self.__CONNECTION_POOL__ is None:
+                if self._connection_factory is None:
+                    raise RuntimeError("set_connection_factory() hasn't been called")
+                self.__CONNECTION_POOL__ = ConnectionPool(
+                    self._connection_factory, pragmas=self._pragmas
+                )
+            return self.__CONNECTION_POOL__
+
+    @contextmanager
+    def transaction(
+        self, connection: ConnectionContextMgr | None = None
+    ) -> Iterator[ConnectionContextMgr]:
+        """
+        Context manager for running several operations in one transaction.
+        Operations inside it that aren't given a connection use the one it
+        provides.  The transaction is committed on exit, or rolled back if an
+        exception was raised.  A transaction inside another one joins it.
+        Args:
+            connection (ConnectionContextMgr | None): A connection that's
+                already in use.  If given, the operations join it instead of
+                starting a new transaction.
+
+        Returns:
+            the connection used by the operations
+        """
+        if connection is None:
+            connection = self._transaction.get()
+
+        if connection is not None:
+            token = self._transaction.set(connection)
+            try:
+                with connection:
+                    yield connection
+            finally:
+                self._transaction.reset(token)
+            return
+
+        connection = self.connection_context()
+        token = self._transaction.set(connection)
+        try:
+            with connection:
+                # Take the write lock up front rather than at the first write,
+                # so a concurrent writer can't cause the transaction to fail
+                # midway with SQLITE_BUSY.
+                connection.cursor().execute("BEGIN IMMEDIATE")
+                try:
+                    yield connection
+                except BaseException:
+                    # Instances remembered during the transaction may not have
+                    # been stored after all.
+                    self.identity_map.clear()
+                    raise
+        finally:
+            self._transaction.reset(token)
+
     def orm_dataclass(self, cls: SomeDataClassType) -> SomeDataClassType:
         """
         Decorator that registers a class for use with ORM.
@@ -102,12 +272,29 @@ class ORM:
         # the possibility of forward references.  The class will
         # be prepped for use with ORM the first time it's used with ORM.
         self.registered_classes[cls] = {"has_descriptors": False}
+
+        # When there are no unresolved forward references, the schema can be
+        # cached right away.  Otherwise it gets cached on first use.
+        try:
+            self.registered_classes[cls]["schema"] = get_instance_fields(cls)
+        except (NameError, TypeError, ValueError):
+            # Errors other than unresolved forward references get reported
+            # the first time the class is used with ORM.
+            pass
+
         self.sql_converter.register_structure_hook(cls, lambda v, _: KeyType(v))
         self.sql_converter.register_unstructure_hook(cls, self.get_rowid)
         return cls
 
     def has_orm(self, instance_or_class: DataClass | DataClassType) -> bool:
-        return get_class(instance_or_class) in self.registered_classes
+        # Membership in registered_classes is already a single hash lookup
+        # without exception handling; get_class() is inlined because this
+        # is called for every field when building statements.  A marker
+        # attribute on the class is not used because it would be inherited
+        # by undecorated subclasses and shared between ORM instances.
+        if isinstance(instance_or_class, type):
+            return instance_or_class in self.registered_classes
+        return type(instance_or_class) in self.registered_classes
 
     def create(
         self,
@@ -115,94 +302,174 @@ class ORM:
         connection: ConnectionContextMgr | None = None,
         drop_if_exists: bool = False,
     ):
-        table, fields = self._get_class_fields(cls)
-
-        # SQLite3 generates a rowid automatically so we don't
-        # need to create an explicit primary key.
-        # Only create the user-defined fields
-
-        column_spec_template = "{name} {datatype}"
-
-        def map_type(field_type):
-            if self.has_orm(field_type):
-                return KeyType
-            else:
-                return field_type
-
-        column_specs = ", ".join(
-            [
-                column_spec_template.format(
-                    name=_.name, datatype=SQLITE_TYPE[map_type(_.non_null_type)]
-                )
-                for _ in fields
-            ]
-        )
+        self._get_class_fields(cls)
+        sql = self._get_sql(cls)
 
         statements = []
         if drop_if_exists:
-            statements.append(f"DROP TABLE IF EXISTS {table}")
+            statements.append(sql["drop"])
 
-        statements.append(f"CREATE TABLE {table} ({column_specs})")
+        statements.append(sql["create"])
 
-        with self.connection_context(connection) as con:
-            cursor = con.cursor()
-            cursor.executescript("; ".join(statements))
+        # The statements are executed one at a time rather than with
+        # executescript(), which would commit any transaction in progress.
+        connection = self.connection_context(connection)
+        with connection:
+            cursor = connection.cursor()
+            for statement in statements:
+                cursor.execute(statement)
 
         return
 
+    def create_all(
+        self,
+        *classes: DataClassType,
+        connection: ConnectionContextMgr | None = None,
+        drop_if_exists: bool = False,
+    ):
+        """Create the tables of several classes using a single transaction.
+
+        Args:
+            classes (DataClassType): The classes whose tables are created
+            connection (ConnectionContextMgr | None): Optional connection to use
+            drop_if_exists (bool): If True, existing tables are dropped first
+        """
+        with self.transaction(connection) as transaction:
+            for cls in classes:
+                self.create(cls, transaction, drop_if_exists)
+
     def insert(
         self, instance: DataClass, connection: ConnectionContextMgr | None = None
     ) -> KeyType:
-        table, fields = get_instance_fields(instance)
-        columns = comma_separated_names(fields, include_rowid=False)
-        values = ", ".join(["?" for _ in fields])
-
-        parameters = self._astuple(instance, fields)
+        _, fields = self._get_instance_fields(instance)
 
-        with self.connection_context(connection) as con:
-            row_id = execute_with_parameters(
-                con, f"INSERT INTO {table} ({columns}) VALUES ({values})", parameters
+        connection = self.connection_context(connection)
+        with connection:
+            parameters = self._astuple(instance, fields, connection)
+            row_id = insert_with_parameters(
+                connection.cursor(), self._get_sql(instance)["insert"], parameters
             )
+            if row_id is None:
+                raise RuntimeError("Row insertion failed to return row_id")
 
-        if row_id is None:
-            raise RuntimeError("Row insertion failed to return row_id")
-
-        self._get_dcorm_state(instance)[SELF_ROW_ID] = row_id
+            self._set_rowid(instance, row_id, connection)
         return row_id
 
+    def insert_many(
+        self,
+        instances: Iterable[DataClass],
+        connection: ConnectionContextMgr | None = None,
+    ) -> list[KeyType]:
+        """Insert several instances using a single transaction.
+
+        Args:
+            instances (Iterable[DataClass]): The instances to insert
+            connection (ConnectionContextMgr | None): Optional connection to use
+
+        Raises:
+            RuntimeError: Raised if an insertion fails to return a rowid
+
+        Returns:
+            list[KeyType]: The rowids of the inserted instances, in order
+        """
+        # executemany() doesn't report the rowid of each row, so the rows are
+        # inserted one at a time, but within a single transaction using one
+        # cursor.  The statement and fields are looked up once per class.
+        row_ids = []
+        statements: dict[type, tuple[str, tuple[Field, ...]]] = {}
+        with self.transaction(connection) as transaction:
+            cursor = transaction.cursor()
+            for instance in instances:
+                statement = statements.get(type(instance))
+                if statement is None:
+                    _, fields = self._get_instance_fields(instance)
+                    statement = statements[type(instance)] = (
+                        self._get_sql(instance)["insert"],
+                        fields,
+                    )
+                insert_query, fields = statement
+                row_id = insert_with_parameters(
+                    cursor,
+                    insert_query,
+                    self._astuple(instance, fields, transaction),
+                )
+                if row_id is None:
+                    raise RuntimeError("Row insertion failed to return row_id")
+
+                self._set_rowid(instance, row_id, transaction)
+                row_ids.append(row_id)
+
+        return row_ids
+
     def get_by_id(
         self,
         cls: type[SomeDataClass],
         id: KeyType,
         connection: ConnectionContextMgr | None = None,
+        eager: bool = False,
+        refresh: bool = False,
     ) -> SomeDataClass:
-        table, fields = self._get_class_fields(cls)
-        columns = comma_separated_names(fields)
+        """Read the instance stored with a rowid.
 
-        query = f"SELECT {columns} FROM {table} WHERE {SQLITE_ROWID} = ?"
+        Args:
+            cls (type[SomeDataClass]): The class of the instance
+            id (KeyType): The rowid of the instance
+            connection (ConnectionContextMgr | None): Optional connection to use
+            eager (bool): If True, the instances referred to by foreign keys are
+                read by the same query instead of when they're first accessed
+            refresh (bool): If True, the row is read from the database even if
+                an instance for it is in use.  The new instance replaces it
+                for later reads.
 
-        with self.connection_context(connection) as con:
-            cursor = con.cursor()
-            cursor.execute(query, (id,))
+        Returns:
+            SomeDataClass: The instance.  Unless refresh is True, an instance
+                that's still in use after being stored or read is returned
+                again without a query, whatever its row in the database now
+                holds.
+        """
+        _, fields = self._get_class_fields(cls)
+        if not refresh:
+            instance = self.identity_map.get((cls, id))
+            if instance is not None:
+                return instance
+
+        sql = self._get_eager_sql(cls) if eager else self._get_sql(cls)
+
+        connection = self.connection_context(connection, readonly=True)
+        with connection:
+            cursor = connection.cursor()
+            cursor.execute(sql["select_by_id"], (id,))
             data = cursor.fetchall()
-        return next(iter(self._query_results_to_instances(data, cls, fields)))
+        instance = next(
+            iter(self._query_results_to_instances(data, cls, fields, eager))
+        )
+        self._remember(instance, id)
+        return instance
 
     def get_all(
         self,
         cls: type[SomeDataClass],
         connection: ConnectionContextMgr | None = None,
+        eager: bool = False,
     ) -> Iterator[SomeDataClass]:
-        table, fields = self._get_class_fields(cls)
-        columns = comma_separated_names(fields)
+        """Read all of the stored instances of a class.
 
-        query = f"SELECT {columns} FROM {table}"
+        Args:
+            cls (type[SomeDataClass]): The class of the instances
+            connection (ConnectionContextMgr | None): Optional connection to use
+            eager (bool): If True, the instances referred to by foreign keys are
+                read by the same query instead of one query each when they're
+                first accessed
 
-        with self.connection_context(connection) as con:
-            cursor = con.cursor()
-            cursor.execute(query)
-            result = self._query_results_to_instances(cursor.fetchall(), cls, fields)
+        Returns:
+            Iterator[SomeDataClass]: The instances, read as they're iterated over
+        """
+        _, fields = self._get_class_fields(cls)
+        sql = self._get_eager_sql(cls) if eager else self._get_sql(cls)
 
-        return result
+        return self._stream_instances(
+            sql["select_all"], (), cls, fields, connection, eager
+        )
 
     def update_by_id(
         self,
@@ -210,15 +477,20 @@ class ORM:
         id: KeyType,
         connection: ConnectionContextMgr | None = None,
     ):
-        table, fields = get_instance_fields(instance)
-        column_changes = ", ".join([f"{_.name} = ?" for _ in fields])
-
-        query = f"UPDATE {table} SET {column_changes} WHERE {SQLITE_ROWID} = ?"
+        _, fields = self._get_instance_fields(instance)
 
-        parameters = self._astuple(instance, fields) + (id,)
+        connection = self.connection_context(connection)
+        with connection:
+            parameters = self._astuple(instance, fields, connection) + (id,)
+            execute_with_parameters(
+                connection.cursor(), self._get_sql(instance)["update"], parameters
+            )
 
-        with self.connection_context(connection) as con:
-            execute_with_parameters(con, query, parameters)
+        # A different instance remembered for this rowid no longer matches
+        # what's stored.
+        key = (type(instance), id)
+        if self.identity_map.get(key) is not instance:
+            self.identity_map.pop(key, None)
 
     def get_rowid(self, instance: DataClass) -> KeyType:
         """Return the rowid associated with the instance in the database or raise an exception if it
@@ -245,56 +517,426 @@ class ORM:
     ):
         self.update_by_id(instance, self.get_rowid(instance), connection)
 
+    def update_many(
+        self,
+        instances: Iterable[DataClass],
+        connection: ConnectionContextMgr | None = None,
+    ):
+        """Update several previously stored instances using a single transaction.
+
+        Args:
+            instances (Iterable[DataClass]): The instances to update
+            connection (ConnectionContextMgr | None): Optional connection to use
+
+        Raises:
+            ValueError: Raised if an instance hasn't been stored in the database
+        """
+        with self.transaction(connection) as transaction:
+            # Group the parameters by statement so that each class is updated
+            # with a single executemany() call.
+            parameters_by_statement: dict[str, list[tuple[Any, ...]]] = defaultdict(
+                list
+            )
+            updated = []
+            for instance in instances:
+                _, fields = self._get_instance_fields(instance)
+                row_id = self.get_rowid(instance)
+                parameters_by_statement[self._get_sql(instance)["update"]].append(
+                    self._astuple(instance, fields, transaction) + (row_id,)
+                )
+                updated.append((instance, row_id))
+                # If the update is rolled back, the instance's changes aren't
+                # stored, so reads have to come from the database again.
+                transaction.on_rollback(self._forget, instance, row_id)
+
+            cursor = transaction.cursor()
+            for query, parameters in parameters_by_statement.items():
+                cursor.executemany(query, parameters)
+
+            # The instances are remembered once they've been stored.
+            for instance, row_id in updated:
+                self._remember(instance, row_id)
+
     def delete_by_id(
         self,
         cls: DataClassType,
         id: KeyType,
         connection: ConnectionContextMgr | None = None,
     ):
-        table, _ = self._get_class_fields(cls)
+        self._get_class_fields(cls)
 
-        query = f"DELETE FROM {table} WHERE {SQLITE_ROWID} = ?"
-
-        with self.connection_context(connection) as con:
-            execute_with_parameters(con, query, (id,))
+        connection = self.connection_context(connection)
+        with connection:
+            execute_with_parameters(
+                connection.cursor(), self._get_sql(cls)["delete_by_id"], (id,)
+            )
+        self.identity_map.pop((cls, id), None)
 
     def delete(
         self, instance: DataClass, connection: ConnectionContextMgr | None = None
     ):
         self.delete_by_id(type(instance), self.get_rowid(instance), connection)
 
+    def _set_rowid(
+        self,
+        instance: DataClass,
+        row_id: KeyType,
+        connection: ConnectionContextMgr,
+    ):
+        # The instance goes back to its previous rowid if the insertion is
+        # rolled back, so that it isn't left referring to a missing row.
+        dcorm_state = self._get_dcorm_state(instance)
+        connection.on_rollback(
+            self._reset_rowid, instance, row_id, dcorm_state[SELF_ROW_ID]
+        )
+        dcorm_state[SELF_ROW_ID] = row_id
+        self._remember(instance, row_id)
+
+    def _reset_rowid(
+        self, instance: DataClass, row_id: KeyType, previous: KeyType | None
+    ):
+        self._forget(instance, row_id)
+        self._get_dcorm_state(instance)[SELF_ROW_ID] = previous
+
+    def _forget(self, instance: DataClass, row_id: KeyType):
+        key = (type(instance), row_id)
+        if self.identity_map.get(key) is instance:
+            del self.identity_map[key]
+
+    def _remember(self, instance: DataClass, row_id: KeyType):
+        try:
+            self.identity_map[(type(instance), row_id)] = instance
+        except TypeError:
+            # Instances of classes with __slots__ may not support weak references.
+            pass
+
+    def _to_sql_parameters(self, parameters: Iterable[Any]) -> list[SQLParameter]:
+        # Only parameters that sqlite3 can't bind as is go through the
+        # converter's type dispatch.  ORM instances, the most common of
+        # those, go straight to their rowid, which is stored when they're
+        # inserted or read.
+        registered = self.registered_classes
+        get_rowid = self.get_rowid
+        unstructure = self.sql_converter.unstructure
+        return [
+            parameter
+            if type(parameter) in NATIVE_SQLITE_TYPES
+            else get_rowid(parameter)
+            if type(parameter) in registered
+            else unstructure(parameter)
+            for parameter in parameters
+        ]
+
     def _get_dcorm_state(self, instance: DataClass) -> dict[str, Any]:
-        if instance not in self.known_objects:
-            self.known_objects[instance] = {SELF_ROW_ID: None}
-        return self.known_objects[instance]
+        # The state is kept directly in the instance's __dict__, which avoids
+        # a weakref lookup on every access.  Instances without a __dict__
+        # fall back to known_objects.
+        try:
+            instance_dict = instance.__dict__
+        except AttributeError:
+            return self.known_objects.setdefault(instance, {SELF_ROW_ID: None})
+
+        # A copy of the instance gets the same __dict__ entries, so the state
+        # records the id of its owner.  A copy gets state of its own that
+        # keeps the field values but not the rowid.
+        dcorm_state = instance_dict.get(DCORM_STATE)
+        if dcorm_state is None:
+            dcorm_state = instance_dict[DCORM_STATE] = {
+                SELF_ROW_ID: None,
+                DCORM_OWNER: id(instance),
+            }
+        elif dcorm_state[DCORM_OWNER] != id(instance):
+            dcorm_state = instance_dict[DCORM_STATE] = {
+                **dcorm_state,
+                SELF_ROW_ID: None,
+                DCORM_OWNER: id(instance),
+            }
+        return dcorm_state
 
     def select(self, cls: DataClassType):
         return Select(self, cls)
 
+    def _stream_instances(
+        self,
+        query: str,
+        parameters: Tuple[SQLParameter, ...],
+        cls: type[SomeDataClass],
+        fields: tuple[Field, ...],
+        connection: ConnectionContextMgr | None = None,
+        eager: bool = False,
+        references: tuple[str, ...] = (),
+        attached: tuple[AttachedReference, ...] = (),
+    ) -> Iterator[SomeDataClass]:
+        # Results are fetched in batches so that memory use doesn't grow
+        # with the size of the result.  The connection stays checked out
+        # until the iterator is exhausted or closed.
+        # The query uses its own cursor rather than the checkout's shared one.
+        with self.connection_context(connection, readonly=True) as con:
+            cursor = con.cursor()
+            # The row builder reads rows by position.
+            cursor.row_factory = None
+            cursor.execute(query, parameters)
+            instances = self._query_results_to_instances(
+                iter_rows(cursor), cls, fields, eager, attached
+            )
+            if references:
+                instances = self._load_references(instances, cls, references, con)
+            yield from instances
+
+    def _stream_rows(
+        self,
+        query: str,
+        parameters: Tuple[SQLParameter, ...],
+        row_type: Callable[..., tuple],
+        connection: ConnectionContextMgr | None = None,
+    ) -> Iterator[tuple]:
+        # Like _stream_instances(), but each row, after its leading rowid,
+        # is returned as a row_type rather than being built into an instance.
+        with self.connection_context(connection, readonly=True) as con:
+            cursor = con.cursor()
+            cursor.row_factory = None
+            cursor.execute(query, parameters)
+            for row in iter_rows(cursor):
+                yield row_type(*row[1:])
+
     def _query_results_to_instances(
-        self, query_result, cls: type[SomeDataClass], fields
+        self,
+        query_result,
+        cls: type[SomeDataClass],
+        fields,
+        eager: bool = False,
+        attached: tuple[AttachedReference, ...] = (),
     ) -> Iterator[SomeDataClass]:
-        for data in query_result:
-            rowid = data[0]
-            field_data = data[1:]
-
-            type_hints = get_type_hints(cls)
-            converted = [
-                self.sql_converter.structure(datum, type_hints[field.name])
-                for datum, field in zip(field_data, fields)
-            ]
-            instance = cls(*converted)
-            self._get_dcorm_state(instance)[SELF_ROW_ID] = KeyType(rowid)
+        row_builder = self._get_row_builder(cls, fields)
+        if eager:
+            attached = self._get_eager_references(cls)
+        if not attached:
+            return row_builder(query_result)
+        return self._attach_references(query_result, row_builder, attached)
+
+    def _get_row_builder(
+        self, cls: type[SomeDataClass], fields: tuple[Field, ...]
+    ) -> Callable[[Iterable[tuple]], Iterator[SomeDataClass]]:
+        return self._get_cached(
+            cls, "row_builder", lambda: self._compile_row_builder(cls, fields)
+        )
+
+    def _attach_references(
+        self,
+        rows: Iterable[tuple],
+        row_builder: Callable[[Iterable[tuple]], Iterator[SomeDataClass]],
+        references: tuple[AttachedReference, ...],
+    ) -> Iterator[SomeDataClass]:
+        # Each row of an eager query carries the columns of the referred to
+        # instances after the instance's own.  Those instances are stored in
+        # the instance's dcorm_state in place of their rowids, so that the
+        # Reference descriptors don't read them again.
+        get_dcorm_state = self._get_dcorm_state
+        rows, instance_rows = itertools.tee(rows)
+        for row, instance in zip(rows, row_builder(instance_rows)):
+            dcorm_state = get_dcorm_state(instance)
+            for name, start, stop, build in references:
+                if row[start] is not None:
+                    dcorm_state[name] = next(build((row[start:stop],)))
             yield instance
 
+    def _load_references(
+        self,
+        instances: Iterator[SomeDataClass],
+        cls: type[SomeDataClass],
+        names: tuple[str, ...],
+        connection: Connection,
+    ) -> Iterator[SomeDataClass]:
+        # The instances referred to by the named fields are read with one
+        # query per field for each batch of instances, rather than with one
+        # query per instance when each reference is first accessed.
+        _, fields = self._get_class_fields(cls)
+        referenced_classes = {field.name: field.non_null_type for field in fields}
+        get_dcorm_state = self._get_dcorm_state
+        while batch := list(itertools.islice(instances, FETCH_BATCH_SIZE)):
+            states = [get_dcorm_state(instance) for instance in batch]
+            for name in names:
+                keys = {
+                    key
+                    for state in states
+                    if isinstance(key := state.get(name), KeyType)
+                }
+                if not keys:
+                    continue
+                found: dict[KeyType, Any] = self._get_many_by_id(
+                    referenced_classes[name], keys, connection
+                )
+                for state in states:
+                    key = state.get(name)
+                    if isinstance(key, KeyType):
+                        # A key with no record is left for the descriptor.
+                        state[name] = found.get(key, key)
+            yield from batch
+
+    def _get_many_by_id(
+        self,
+        cls: type[SomeDataClass],
+        ids: Iterable[KeyType],
+        connection: Connection,
+    ) -> dict[KeyType, SomeDataClass]:
+        # Instances that are still in use are taken from the identity map,
+        # and the rest are read with a single query.
+        instances = {}
+        missing = []
+        for id in ids:
+            instance = self.identity_map.get((cls, id))
+            if instance is None:
+                missing.append(id)
+            else:
+                instances[id] = instance
+
+        if missing:
+            _, fields = self._get_class_fields(cls)
+            placeholders = ", ".join("?" * len(missing))
+            cursor = connection.cursor()
+            cursor.row_factory = None
+            cursor.execute(
+                f"{self._get_sql(cls)['select_all']} "
+                f"WHERE {SQLITE_ROWID} IN ({placeholders})",
+                tuple(missing),
+            )
+            for instance in self._query_results_to_instances(
+                cursor.fetchall(), cls, fields
+            ):
+                id = self._get_dcorm_state(instance)[SELF_ROW_ID]
+                self._remember(instance, id)
+                instances[id] = instance
+        return instances
+
+    def _read_with_ancestors(
+        self,
+        query: str,
+        parameters: Tuple[SQLParameter, ...],
+        cls: type[SomeDataClass],
+        fields: tuple[Field, ...],
+        name: str,
+        connection: ConnectionContextMgr | None = None,
+        references: tuple[str, ...] = (),
+    ) -> list[SomeDataClass]:
+        # The query returns the matched rows followed by their ancestors, each
+        # ending with a flag that's 1 for matched rows.  A matched row that's
+        # also an ancestor of another appears twice.  The row builder reads
+        # columns by position, so the flag doesn't need to be removed.
+        with self.connection_context(connection, readonly=True) as con:
+            cursor = con.cursor()
+            cursor.row_factory = None
+            cursor.execute(query, parameters)
+            rows = cast(list[tuple], cursor.fetchall())
+
+            row_builder = self._get_row_builder(cls, fields)
+            matched = list(row_builder(row for row in rows if row[-1]))
+            instances = {
+                self._get_dcorm_state(instance)[SELF_ROW_ID]: instance
+                for instance in matched
+            }
+
+            # Ancestors that are still in use are taken from the identity map.
+            ancestor_rows = []
+            for row in rows:
+                if row[0] not in instances:
+                    instance = self.identity_map.get((cls, KeyType(row[0])))
+                    if instance is None:
+                        ancestor_rows.append(row)
+                    else:
+                        instances[row[0]] = instance
+            for instance in row_builder(ancestor_rows):
+                id = self._get_dcorm_state(instance)[SELF_ROW_ID]
+                self._remember(instance, id)
+                instances[id] = instance
+
+            for instance in instances.values():
+                dcorm_state = self._get_dcorm_state(instance)
+                key = dcorm_state.get(name)
+                if isinstance(key, KeyType):
+                    dcorm_state[name] = instances.get(key, key)
+
+            if references:
+                matched = list(
+                    self._load_references(iter(matched), cls, references, con)
+                )
+        return matched
+
+    def _compile_row_builder(
+        self, cls: type[SomeDataClass], fields: tuple[Field, ...]
+    ) -> Callable[[Iterable[tuple]], Iterator[SomeDataClass]]:
+        # Generate a function specialized to the class's fields so that the
+        # row loop has no per-field iteration.  The cattrs structure hook for
+        # each field is resolved once here rather than dispatched per value,
+        # and values sqlite3 already returns natively are used as is.  Hooks
+        # are looked up for the non-null type, with None checked inline for
+        # nullable fields, rather than going through cattrs' Optional
+        # handling.  The class and the state accessor are bound as defaults
+        # so they are local lookups inside the loop.  What remains per row is
+        # the dataclass __init__ itself.
+        field_types = [field.non_null_type for field in fields]
+        namespace: dict[str, Any] = {
+            "KeyType": KeyType,
+            "SELF_ROW_ID": SELF_ROW_ID,
+            "_cls": cls,
+            "_get_dcorm_state": self._get_dcorm_state,
+        }
+        arguments = []
+        for index, (decoder, field_type, field) in enumerate(
+            zip(self._get_decoders(field_types), field_types, fields), start=1
+        ):
+            if decoder is _passthrough:
+                arguments.append(f"row[{index}]")
+                continue
+
+            namespace[f"decoder_{index}"] = decoder
+            namespace[f"type_{index}"] = field_type
+            decoded = f"decoder_{index}(row[{index}], type_{index})"
+            if field.nullable:
+                decoded = f"(None if row[{index}] is None else {decoded})"
+            arguments.append(decoded)
+
+        # Only the Reference descriptors of foreign keys store state while an
+        # instance is being initialized.  Without them, an instance that
+        # has a __dict__ can be given its state directly.
+        if cls.__dictoffset__ and not self._get_foreign_keys(cls, fields):
+            namespace["DCORM_STATE"] = DCORM_STATE
+            namespace["DCORM_OWNER"] = DCORM_OWNER
+            set_rowid = (
+                "instance.__dict__[DCORM_STATE] = "
+                "{SELF_ROW_ID: KeyType(row[0]), DCORM_OWNER: id(instance)}"
+            )
+        else:
+            set_rowid = "get_dcorm_state(instance)[SELF_ROW_ID] = KeyType(row[0])"
+
+        source = (
+            "def row_builder(rows, cls=_cls, get_dcorm_state=_get_dcorm_state):\n"
+            "    for row in rows:\n"
+            f"        instance = cls({', '.join(arguments)})\n"
+            f"        {set_rowid}\n"
+            "        yield instance\n"
+        )
+        exec(source, namespace)
+        return namespace["row_builder"]
+
+    def _get_decoders(
+        self, field_types: list[type]
+    ) -> tuple[Callable[[Any, type], Any], ...]:
+        dispatch = self.sql_converter._structure_func.dispatch
+        return tuple(
+            _passthrough if field_type in NATIVE_SQLITE_TYPES else dispatch(field_type)
+            for field_type in field_types
+        )
+
     def _add_descriptors_if_missing(self, cls, fields):
         if not self.registered_classes[cls]["has_descriptors"]:
             for field in fields:
                 if self.has_orm(field.non_null_type):
                     # If there was a default value set, copy it into the
-                    # ForeignReference descriptor class
-                    has_default = hasattr(cls, field.name)
-                    default = getattr(cls, field.name, None)
+                    # ForeignReference descriptor class.  It's taken from
+                    # the dataclass field because the class attribute of a
+                    # slotted dataclass is the slot rather than the default.
+                    default = cls.__dataclass_fields__[field.name].default
+                    has_default = default is not dataclasses.MISSING
                     setattr(
                         cls,
                         field.name,
@@ -309,30 +951,89 @@ class ORM:
         self,
         instance: DataClass,
         fields: tuple[Field, ...],
+        connection: ConnectionContextMgr | None = None,
     ) -> tuple[Any, ...]:
-        def values(fields: tuple[Field, ...]):
-            for field in fields:
-                field_value = getattr(instance, field.name)
-                if field_value is not None and self.has_orm(field.non_null_type):
-                    # Because this field has ORM, on a read, it is assumed
-                    # to be a rowid in the the table associated with
-                    # non_null_type. To preserve the validity of this pointer,
-                    # don't write anything in this field other than a reference
-                    # to the type expected by the type hint or the value None.
-                    if isinstance(field_value, field.non_null_type):
-                        rowid = self._get_dcorm_state(field_value)[SELF_ROW_ID]
-                        if rowid is None:
-                            rowid = self.insert(field_value)
-                        yield rowid
-                    else:
-                        raise TypeError(
-                            f"{field.name} in {type(instance)} is "
-                            f"{type(field_value)} but should be {field.non_null_type}"
-                        )
+        # Only the foreign key fields and the fields that sqlite3 can't store
+        # as is need any processing.  Without any, the getter's tuple is
+        # already the row.
+        parameters_builder = self._get_cached(
+            instance,
+            "parameters_builder",
+            lambda: self._compile_parameters_builder(instance, fields),
+        )
+        return parameters_builder(instance, connection)
+
+    def _compile_parameters_builder(
+        self, instance_or_class: DataClass | DataClassType, fields: tuple[Field, ...]
+    ) -> Callable[[DataClass, ConnectionContextMgr | None], tuple[Any, ...]]:
+        foreign_keys = dict(self._get_foreign_keys(instance_or_class, fields))
+        encoders = dict(self._get_encoders(instance_or_class, fields))
+        getter = self._get_values_getter(instance_or_class, fields)
+        if not foreign_keys and not encoders:
+            return lambda instance, _: getter(instance)
+
+        # Otherwise generate a function that builds the row with one
+        # expression per field, like the row builder does for reads.
+        namespace: dict[str, Any] = {}
+        values = []
+        for index, field in enumerate(fields):
+            if index in foreign_keys:
+                namespace[f"field_{index}"] = field
+                values.append(f"foreign_key(instance, field_{index}, connection)")
+            elif index in encoders:
+                # Only nullable fields need a None check.
+                namespace[f"encoder_{index}"] = encoders[index]
+                if field.nullable:
+                    values.append(
+                        f"(None if (value := instance.{field.name}) is None "
+                        f"else encoder_{index}(value))"
+                    )
                 else:
-                    yield field_value
+                    values.append(f"encoder_{index}(instance.{field.name})")
+            else:
+                values.append(f"instance.{field.name}")
+
+        namespace["_foreign_key"] = self._foreign_key_parameter
+        source = (
+            "def parameters_builder(instance, connection, foreign_key=_foreign_key):\n"
+            f"    return ({', '.join(values)},)\n"
+        )
+        exec(source, namespace)
+        return namespace["parameters_builder"]
 
-        return tuple(values(fields))
+    def _foreign_key_parameter(
+        self,
+        instance: DataClass,
+        field: Field,
+        connection: ConnectionContextMgr | None,
+    ) -> KeyType | None:
+        # A reference that hasn't been dereferenced is still a rowid in the
+        # instance's dcorm_state, so it's used without reading the instance
+        # it refers to.
+        key = self._get_dcorm_state(instance).get(field.name)
+        if isinstance(key, KeyType):
+            return key
+
+        field_value = getattr(instance, field.name)
+        if field_value is None:
+            return None
+
+        # Because this field has ORM, on a read, it is assumed
+        # to be a rowid in the the table associated with
+        # non_null_type. To preserve the validity of this pointer,
+        # don't write anything in this field other than a reference
+        # to the type expected by the type hint or the value None.
+        field_type = field.non_null_type
+        if isinstance(field_value, field_type):
+            rowid = self._get_dcorm_state(field_value)[SELF_ROW_ID]
+            if rowid is None:
+                rowid = self.insert(field_value, connection)
+            return rowid
+        else:
+            raise TypeError(
+                f"{field.name} in {type(instance)} is "
+                f"{type(field_value)} but should be {field_type}"
+            )
 
     def _get_class_fields(self, cls: DataClassType) -> tuple[str, tuple[Field, ...]]:
         if not isinstance(cls, type):
@@ -341,16 +1042,251 @@ class ORM:
         if cls not in self.registered_classes:
             raise TypeError(f"{cls} has not been registered with use with ORM")
 
-        table, fields = get_instance_fields(cls)
+        # Once a class has been prepared, its table and fields are attached
+        # to the class itself.  Look in the class's own __dict__ so that a
+        # subclass doesn't pick up its parent's table.
+        table = cls.__dict__.get(DCORM_TABLE)
+        if table is not None:
+            return table, cls.__dict__[DCORM_FIELDS]
+
+        table, fields = self._get_schema(cls)
 
         # This is a convenient place to add descriptors if they don't already
         # exist.  This should be done after all forward references have been
-        # resolved.  If the previous call to get_instance_fields() returned
+        # resolved.  If the previous call to _get_schema() returned
         # successfully, then the forward references have been resolved.
         self._add_descriptors_if_missing(cls, fields)
 
+        setattr(cls, DCORM_TABLE, table)
+        setattr(cls, DCORM_FIELDS, fields)
+        setattr(cls, DCORM_SQL, self._get_sql(cls))
         return table, fields
 
+    def _get_instance_fields(
+        self, instance: DataClass
+    ) -> tuple[str, tuple[Field, ...]]:
+        return self._get_schema(instance)
+
+    def _get_schema(
+        self, instance_or_class: DataClass | DataClassType
+    ) -> tuple[str, tuple[Field, ...]]:
+        return self._get_cached(
+            instance_or_class, "schema", lambda: get_instance_fields(instance_or_class)
+        )
+
+    def _get_sql(self, instance_or_class: DataClass | DataClassType) -> dict[str, str]:
+        # Prepared classes carry their statements, like their table and
+        # fields.  Otherwise fall back to the registration cache.
+        sql = get_class(instance_or_class).__dict__.get(DCORM_SQL)
+        if sql is not None:
+            return sql
+
+        return self._get_cached(
+            instance_or_class,
+            "sql",
+            lambda: self._build_sql(*self._get_schema(instance_or_class)),
+        )
+
+    def _get_columns(
+        self,
+        instance_or_class: DataClass | DataClassType,
+        include_rowid: bool = True,
+        table: str | None = None,
+    ) -> str:
+        # The comma separated column lists, keyed by the arguments
+        # to comma_separated_names() that produced them.
+        columns = self._get_cached(instance_or_class, "columns", dict)
+        key = (include_rowid, table)
+        names = columns.get(key)
+        if names is None:
+            _, fields = self._get_schema(instance_or_class)
+            names = columns[key] = sys.intern(
+                comma_separated_names(fields, include_rowid, table)
+            )
+        return names
+
+    def _get_unstructurers(
+        self, instance_or_class: DataClass | DataClassType
+    ) -> dict[str, tuple[type, Callable[[Any], Any]]]:
+        # The type of each field, keyed by name, along with the cattrs
+        # unstructure hook for that type.
+        def build():
+            _, fields = self._get_schema(instance_or_class)
+            dispatch = self.sql_converter._unstructure_func.dispatch
+            return {
+                field.name: (field.non_null_type, dispatch(field.non_null_type))
+                for field in fields
+            }
+
+        return self._get_cached(instance_or_class, "unstructurers", build)
+
+    def _get_values_getter(
+        self, instance_or_class: DataClass | DataClassType, fields: tuple[Field, ...]
+    ) -> Callable[[DataClass], tuple[Any, ...]]:
+        # attrgetter fetches all of the field values in a single call, but
+        # returns a bare value rather than a tuple when there's only one field.
+        def build():
+            getter = operator.attrgetter(*[field.name for field in fields])
+            if len(fields) == 1:
+                return lambda instance: (getter(instance),)
+            return getter
+
+        return self._get_cached(instance_or_class, "values_getter", build)
+
+    def _get_foreign_keys(
+        self, instance_or_class: DataClass | DataClassType, fields: tuple[Field, ...]
+    ) -> tuple[tuple[int, type], ...]:
+        # The index and referenced type of each field that refers to
+        # another ORM class.
+        return self._get_cached(
+            instance_or_class,
+            "foreign_keys",
+            lambda: tuple(
+                (index, field.non_null_type)
+                for index, field in enumerate(fields)
+                if self.has_orm(field.non_null_type)
+            ),
+        )
+
+    def _get_encoders(
+        self, instance_or_class: DataClass | DataClassType, fields: tuple[Field, ...]
+    ) -> tuple[tuple[int, Callable[[Any], Any]], ...]:
+        # The index and cattrs unstructure hook of each field whose values
+        # aren't stored as is.  Foreign keys are handled separately.
+        def build():
+            dispatch = self.sql_converter._unstructure_func.dispatch
+            return tuple(
+                (index, dispatch(field.non_null_type))
+                for index, field in enumerate(fields)
+                if field.non_null_type not in NATIVE_SQLITE_TYPES
+                and not self.has_orm(field.non_null_type)
+            )
+
+        return self._get_cached(instance_or_class, "encoders", build)
+
+    def _get_eager_references(
+        self, cls: DataClassType
+    ) -> tuple[AttachedReference, ...]:
+        # The name of each foreign key field, the slice of an eager query's
+        # row holding the referred to instance, and that class's row builder.
+        def build():
+            _, fields = self._get_class_fields(cls)
+            return self._get_attached_references(
+                cls,
+                tuple(
+                    (fields[index].name, field_type)
+                    for index, field_type in self._get_foreign_keys(cls, fields)
+                ),
+            )
+
+        return self._get_cached(cls, "eager_references", build)
+
+    def _get_attached_references(
+        self, cls: DataClassType, references: tuple[tuple[str, DataClassType], ...]
+    ) -> tuple[AttachedReference, ...]:
+        # The columns of each referred to class follow those of the class,
+        # in the order of the references.
+        _, fields = self._get_class_fields(cls)
+        attached: list[AttachedReference] = []
+        start = len(fields) + 1
+        for name, other_class in references:
+            _, other_fields = self._get_class_fields(other_class)
+            stop = start + len(other_fields) + 1
+            attached.append(
+                (name, start, stop, self._get_row_builder(other_class, other_fields))
+            )
+            start = stop
+        return tuple(attached)
+
+    def _get_eager_sql(self, cls: DataClassType) -> dict[str, str]:
+        # Queries that LEFT JOIN the table of each foreign key, so that the
+        # referred to instances are read by the same query.  The joined
+        # tables are aliased by the name of the foreign key field.
+        def build():
+            table, fields = self._get_class_fields(cls)
+            columns = [self._get_columns(cls, table=table)]
+            joins = []
+            for index, field_type in self._get_foreign_keys(cls, fields):
+                alias = fields[index].name
+                other_table, _ = self._get_class_fields(field_type)
+                columns.append(self._get_columns(field_type, table=alias))
+                joins.append(
+                    f"LEFT JOIN {other_table} {alias} "
+                    f"ON {table}.{alias} = {alias}.{SQLITE_ROWID}"
+                )
+
+            select_all = " ".join([f"SELECT {', '.join(columns)} FROM {table}"] + joins)
+            return {
+                "select_all": select_all,
+                "select_by_id": f"{select_all} WHERE {table}.{SQLITE_ROWID} = ?",
+            }
+
+        return self._get_cached(cls, "eager_sql", build)
+
+    def _get_cached(
+        self,
+        instance_or_class: DataClass | DataClassType,
+        key: str,
+        build: Callable[[], Any],
+    ) -> Any:
+        # The schema of a registered class and everything derived from it
+        # never change, so they are built once and kept with the rest of the
+        # class's ORM state.  Unregistered classes aren't cached.
+        registration = self.registered_classes.get(get_class(instance_or_class))
+        if registration is None:
+            return build()
+
+        value = registration.get(key)
+        if value is None:
+            value = registration[key] = build()
+        return value
+
+    def _build_sql(self, table: str, fields: tuple[Field, ...]) -> dict[str, str]:
+        # SQLite3 generates a rowid automatically.  It's declared as an
+        # INTEGER PRIMARY KEY named after the rowid, which makes it an alias
+        # for the rowid rather than a separate column.  Foreign keys store
+        # rowids, and a declared rowid can't be renumbered by VACUUM.
+
+        column_spec_template = "{name} {datatype}"
+
+        def map_type(field_type):
+            if self.has_orm(field_type):
+                return KeyType
+            else:
+                return field_type
+
+        column_specs = ", ".join(
+            [
+                column_spec_template.format(
+                    name=_.name,
+                    datatype=_sql_type(map_type(_.non_null_type), SQLITE_DEFAULT_TYPE),
+                )
+                for _ in fields
+            ]
+        )
+
+        columns = comma_separated_names(fields)
+        insert_columns = comma_separated_names(fields, include_rowid=False)
+        placeholders = ", ".join(["?"] * len(fields))
+        column_changes = ", ".join([f"{_.name} = ?" for _ in fields])
+        returning = f" RETURNING {SQLITE_ROWID}" if SQLITE_HAS_RETURNING else ""
+
+        return {
+            "create": (
+                f"CREATE TABLE {table} "
+                f"({SQLITE_ROWID} INTEGER PRIMARY KEY, {column_specs})"
+            ),
+            "drop": f"DROP TABLE IF EXISTS {table}",
+            "insert": (
+                f"INSERT INTO {table} ({insert_columns}) "
+                f"VALUES ({placeholders}){returning}"
+            ),
+            "update": f"UPDATE {table} SET {column_changes} WHERE {SQLITE_ROWID} = ?",
+            "select_all": f"SELECT {columns} FROM {table}",
+            "select_by_id": f"SELECT {columns} FROM {table} WHERE {SQLITE_ROWID} = ?",
+            "delete_by_id": f"DELETE FROM {table} WHERE {SQLITE_ROWID} = ?",
+        }
+
 
 class Reference:
     """
@@ -381,10 +1317,12 @@ class Reference:
     def fix_preexisting(self, instance, dcorm_state):
         # Check for an attribute that may have pre-existed *when* this
         # descriptor was added.  If it exists move it to dcorm_state
-        # and remove it from __dict__.
-        if (pre_existing := instance.__dict__.get(self.name)) is not None:
+        # and remove it from __dict__.  Slotted instances have no __dict__
+        # and their slot for the attribute is replaced by this descriptor.
+        instance_dict = getattr(instance, "__dict__", None)
+        if instance_dict and (pre_existing := instance_dict.get(self.name)) is not None:
             dcorm_state[self.name] = pre_existing
-            del instance.__dict__[self.name]
+            del instance_dict[self.name]
 
     def __get__(self, instance, cls):
         # The state of contained classes and foreign keys
@@ -404,10 +1342,13 @@ class Reference:
             value_or_key = dcorm_state[self.name]
 
         if isinstance(value_or_key, KeyType):
-            # value is a foreign key that needs to be dereferenced
-            return self.orm.get_by_id(self.cls, value_or_key)
-        else:
-            return value_or_key
+            # value is a foreign key that needs to be dereferenced.  The
+            # instance replaces the key so that it's read only once, and so
+            # that the identity map can share it while it's referred to.
+            value_or_key = dcorm_state[self.name] = self.orm.get_by_id(
+                self.cls, value_or_key
+            )
+        return value_or_key
 
     def __set__(self, instance, value):
         dcorm_state = self.orm._get_dcorm_state(instance)
@@ -421,31 +1362,62 @@ class Reference:
 
 
 class Select:
+    __slots__ = (
+        "orm",
+        "dataclass",
+        "table",
+        "fields",
+        "joins",
+        "where_clauses",
+        "parameters",
+        "_compiled",
+        "_compiled_parameters",
+        "references",
+        "ancestors",
+        "joined",
+        "_attached",
+    )
+
     orm: ORM
     dataclass: DataClassType
     table: str
     fields: tuple[Field, ...]
 
-    # All of the join lists must have the same length
-    join_attributes: list[str]
-    join_aliases: list[str]
-    join_tables: list[str]
-    join_other_attributes: list[str]
-    join_other_aliases: list[str]
+    # (table, alias, attribute, other_attribute) for each join
+    joins: list[tuple[str, str, str, str]]
 
     where_clauses: list[str]
     parameters: list[Any]
 
+    # The statement compiled by get_statement() and a snapshot of its
+    # parameters.  Reset by every method that changes the query.
+    _compiled: str | None
+    _compiled_parameters: tuple[SQLParameter, ...]
+
+    # The foreign key fields whose instances are read in batches
+    references: tuple[str, ...]
+
+    # The field referring to the parent, when ancestors are read as well
+    ancestors: str | None
+
+    # (alias, class) of each join on a foreign key.  The joined instances are
+    # read along with the results, compiled into _attached.
+    joined: list[tuple[str, DataClassType]]
+    _attached: tuple[AttachedReference, ...]
+
     def __init__(self, orm: ORM, dataclass: DataClassType):
         self.orm = orm
         self.dataclass = dataclass
         self.table, self.fields = orm._get_class_fields(dataclass)
-        self.join_attributes = []
-        self.join_tables = []
-        self.join_aliases = []
-        self.join_other_attributes = []
-        self.where_clauses = []
-        self.parameters = []
+        self.joins = _EMPTY
+        self.where_clauses = _EMPTY
+        self.parameters = _EMPTY
+        self._compiled = None
+        self._compiled_parameters = ()
+        self.references = ()
+        self.ancestors = None
+        self.joined = _EMPTY
+        self._attached = ()
 
     def join(
         self,
@@ -454,6 +1426,7 @@ class Select:
         other_attribute: str | None = None,
     ) -> Select:
         validate_join_arguments(attribute, dataclass_or_select, other_attribute)
+        self._compiled = None
 
         # `other_class` is the class/table we're joining to.  It's either an explicitly
         # passed class or it's the class of the Select that's passed.  Below,
@@ -469,18 +1442,35 @@ class Select:
         # type of the field pointed to by the first attribute, however,
         # we don't allow the other attribute to be used in this case.
 
-        # Most of these calls have side effect on self.join_attributes,
-        # self.join_tables, self.join_alias, and self.join_other_attributes.
-        left_type = self._get_left_join_type(attribute)
+        left_type, left_column = self._get_left_join_type(attribute)
         other_class = self._get_other_join_class(dataclass_or_select, left_type)
-        self._handle_right_join_type(left_type, other_class, other_attribute)
+        right_column = self._handle_right_join_type(
+            left_type, other_class, other_attribute
+        )
 
         join_table = self._get_join_table(other_class)
 
         # Set an alias for the table/select being joined.  The select *must*
         # have an alias!
-        self.join_aliases.append(attribute if attribute else join_table)
-        self._add_to_join_table(join_table, dataclass_or_select)
+        alias = attribute if attribute else join_table
+        assert alias
+        if self.joins is _EMPTY:
+            self.joins = []
+        self.joins.append(
+            (
+                self._add_to_join_table(join_table, dataclass_or_select),
+                alias,
+                left_column,
+                right_column,
+            )
+        )
+
+        # The instance a foreign key refers to is in the joined row, so it's
+        # read by the same query rather than when it's first accessed.
+        if attribute is not None and right_column == SQLITE_ROWID:
+            if self.joined is _EMPTY:
+                self.joined = []
+            self.joined.append((alias, other_class))
 
         return self
 
@@ -489,66 +1479,135 @@ class Select:
         where_clause: str,
         parameters: tuple[SQLParameter, ...] = (),
     ) -> Select:
+        self._compiled = None
+        if self.where_clauses is _EMPTY:
+            self.where_clauses = []
         self.where_clauses.append(f"({where_clause})")
-        self.parameters.extend(
-            (self.orm.sql_converter.unstructure(parameter) for parameter in parameters)
-        )
+        if parameters:
+            if self.parameters is _EMPTY:
+                self.parameters = []
+            self.parameters.extend(self.orm._to_sql_parameters(parameters))
         return self
 
     def where_equal(self, attribute: str, other: Any) -> Select:
-        field = find_field(attribute, self.dataclass)
-        if type(other) == field.type:
-            converted_other = self.orm.sql_converter.unstructure(other)
-            self.where_clauses.append(f"{attribute} = {converted_other}")
-        else:
-            raise ValueError(f"Types {field.type} and {type(other)} are not compatible")
+        try:
+            field_type, unstructure = self.orm._get_unstructurers(self.dataclass)[
+                attribute
+            ]
+        except KeyError:
+            raise ValueError(f"{attribute} is not a field of {self.dataclass}")
+
+        if not isinstance(other, field_type):
+            raise ValueError(f"Types {field_type} and {type(other)} are not compatible")
+
+        # The value is bound as a parameter rather than written into the
+        # clause, so the statement has the same shape for every value and
+        # is the same as where(f"{attribute} = ?", (other,)).
+        self._compiled = None
+        if self.where_clauses is _EMPTY:
+            self.where_clauses = []
+        self.where_clauses.append(f"({attribute} = ?)")
+        if self.parameters is _EMPTY:
+            self.parameters = []
+        self.parameters.append(unstructure(other))
+        return self
 
+    def eager(self, *field_names: str) -> Select:
+        """
+        Read the instances referred to by the foreign key fields along with
+        the results.  Rather than one query per result when each reference is
+        first accessed, they're read with one query per field for each batch
+        of results.
+        Args:
+            field_names (str): The names of the foreign key fields
+
+        Returns:
+            Select: This Select
+        """
+        for name in field_names:
+            if not self.orm.has_orm(self._get_field_type(name, self.dataclass)):
+                raise ValueError(f"{name} is not a foreign key field of {self.table}")
+        self.references += field_names
         return self
 
-    def get_statement(self) -> str:
-        if len(self.join_attributes) > 0:
-            has_join = True
-        else:
-            has_join = False
+    def with_ancestors(self, field_name: str) -> Select:
+        """
+        Read the ancestors of the results along with them using a single
+        recursive query.  The field refers to the parent of an instance, so
+        following it from each result reaches every ancestor without another
+        query.
+        Args:
+            field_name (str): The name of a field referring to the same class
+
+        Returns:
+            Select: This Select
+        """
+        if self._get_field_type(field_name, self.dataclass) is not self.dataclass:
+            raise ValueError(f"{field_name} doesn't refer to {self.table}")
+        self._compiled = None
+        self.ancestors = field_name
+        return self
 
-        columns = comma_separated_names(
-            self.fields, table=(self.table if has_join else None)
+    def get_statement(self) -> str:
+        if self._compiled is None:
+            self._compiled = self._compile()
+            self._compiled_parameters = tuple(self.parameters)
+        return self._compiled
+
+    def _compile(self) -> str:
+        has_join = bool(self.joins)
+        columns = self.orm._get_columns(
+            self.dataclass, table=(self.table if has_join else None)
         )
 
-        join_list = []
-        for table, alias, attribute, other_attribute in zip(
-            self.join_tables,
-            self.join_aliases,
-            self.join_attributes,
-            self.join_other_attributes,
-        ):
-            join_list.append(
-                f"JOIN {table} {alias} "
-                f"ON {self.table}.{attribute} = {alias if alias else table}.{other_attribute}"
+        # The recursive query for ancestors only has the class's own columns.
+        self._attached = ()
+        if self.joined and self.ancestors is None:
+            columns = ", ".join(
+                [columns]
+                + [
+                    self.orm._get_columns(other_class, table=alias)
+                    for alias, other_class in self.joined
+                ]
+            )
+            self._attached = self.orm._get_attached_references(
+                self.dataclass, tuple(self.joined)
             )
-        joins = " ".join(join_list)
-
-        where_clause = " AND ".join(self.where_clauses)
-        where = "WHERE" if where_clause else ""
-
-        if has_join:
-            distinct = "DISTINCT"
-        else:
-            distinct = ""
 
-        select = f"SELECT {distinct} {columns} FROM {self.table} {joins} {where} {where_clause}"
-        return select
+        statement = compile_select(
+            self.table,
+            columns,
+            tuple(self.joins),
+            tuple(self.where_clauses),
+        )
+        if self.ancestors is not None:
+            statement = compile_ancestors(
+                statement,
+                self.table,
+                self.orm._get_columns(self.dataclass),
+                self.orm._get_columns(self.dataclass, table="ancestor"),
+                self.ancestors,
+            )
+        return statement
 
     # Determine the left type:
-    def _get_left_join_type(self, attribute: str | None) -> DataClassType:
+    def _get_left_join_type(self, attribute: str | None) -> tuple[DataClassType, str]:
         if attribute is None:
-            self.join_attributes.append(SQLITE_ROWID)
-            left_type = self.dataclass
-        else:
-            self.join_attributes.append(attribute)
-            field = find_field(attribute, self.dataclass)
-            left_type = field.type
-        return left_type
+            return self.dataclass, SQLITE_ROWID
+
+        return self._get_field_type(attribute, self.dataclass), attribute
+
+    def _get_field_type(self, attribute: str, dataclass: DataClassType) -> type:
+        # The type hints resolved when the schema was cached, rather than the
+        # dataclass field's annotation, which is a string under postponed
+        # evaluation and includes None for optional fields.
+        if not self.orm.has_orm(dataclass):
+            raise ValueError(f"{dataclass} is not an ORM dataclass")
+        try:
+            field_type, _ = self.orm._get_unstructurers(dataclass)[attribute]
+        except KeyError:
+            raise ValueError(f"{attribute} is not a field of {dataclass}")
+        return field_type
 
     def _get_other_join_class(
         self,
@@ -570,67 +1629,288 @@ class Select:
         return other_class
 
     def _get_join_table(self, other_class: DataClassType) -> str:
-        try:
-            join_table, _ = self.orm._get_class_fields(other_class)
-        except TypeError:
+        if not self.orm.has_orm(other_class):
             raise ValueError(f"{other_class} is not an ORM dataclass")
+        join_table, _ = self.orm._get_class_fields(other_class)
         return join_table
 
     def _add_to_join_table(
         self, join_table: str, dataclass_or_select: DataClass | Select | None
-    ):
-        # Add table or select to self.join_tables
+    ) -> str:
+        # Return the table or select to join to
         if dataclass_or_select is not None and isinstance(dataclass_or_select, Select):
             # Treat the select just like a table.
             select_statement = dataclass_or_select.get_statement()
-            self.join_tables.append(f"( {select_statement} )")
-            self.parameters = dataclass_or_select.parameters + self.parameters
+            if dataclass_or_select.parameters:
+                if self.parameters is _EMPTY:
+                    self.parameters = []
+                self.parameters[:0] = dataclass_or_select.parameters
+            return f"( {select_statement} )"
         else:
-            self.join_tables.append(join_table)
+            return join_table
 
     def _handle_right_join_type(
         self,
         left_type: DataClassType,
         other_class: DataClassType,
         other_attribute: str | None,
-    ):
+    ) -> str:
         # Determine the right type
         if other_attribute is None:
-            self.join_other_attributes.append(SQLITE_ROWID)
+            right_column = SQLITE_ROWID
             right_type = other_class
         else:
-            self.join_other_attributes.append(other_attribute)
-            other_field = find_field(other_attribute, other_class)
-            right_type = other_field.type
+            right_column = other_attribute
+            right_type = self._get_field_type(other_attribute, other_class)
 
         if left_type is not right_type:
             raise TypeError(
                 f"The type of the left side of the join is {left_type} but the "
                 f"type of the right side of the join is {right_type}"
             )
+        return right_column
+
+    def values(
+        self,
+        *columns: str,
+        connection: ConnectionContextMgr | None = None,
+    ) -> Iterator[tuple]:
+        """
+        Run the query reading only the given columns, without building
+        instances.
+
+        Args:
+            *columns (str): The columns to read, e.g. "name", or "course.title"
+                for a joined table.
+            connection (ConnectionContextMgr, optional): The connection to use
+
+        Returns:
+            Iterator[tuple]: A named tuple for each row with the values as
+                stored, e.g. rowids for foreign keys.  The fields are named
+                after the columns with "." replaced by "_".
+        """
+        if not columns:
+            raise ValueError("values() requires at least one column")
+        if self.ancestors is not None:
+            raise ValueError("values() can't be used with with_ancestors()")
+
+        # The rowid is read along with the columns, and left out of the
+        # results, so that the DISTINCT of a joined select removes only
+        # repeated rows of the same result.
+        self.get_statement()
+        statement = compile_select(
+            self.table,
+            ", ".join((f"{self.table}.{SQLITE_ROWID}",) + columns),
+            tuple(self.joins),
+            tuple(self.where_clauses),
+        )
+        return self.orm._stream_rows(
+            statement, self._compiled_parameters, _row_type(columns), connection
+        )
+
+    def count(self, connection: ConnectionContextMgr | None = None) -> int:
+        """
+        Count the results of the query in the database without reading them.
+
+        Args:
+            connection (ConnectionContextMgr, optional): The connection to use
+
+        Returns:
+            int: The number of results
+        """
+        if self.ancestors is not None:
+            raise ValueError("count() can't be used with with_ancestors()")
+
+        # Joins can repeat rows, so the results are counted after the
+        # statement's DISTINCT has removed them.
+        statement = f"SELECT COUNT(*) FROM ({self.get_statement()})"
+        with self.orm.connection_context(connection, readonly=True) as con:
+            cursor = con.cursor()
+            cursor.row_factory = None
+            cursor.execute(statement, self._compiled_parameters)
+            return cast(int, cursor.fetchall()[0][0])
+
+    def prepare(
+        self,
+    ) -> Callable[..., Iterator[DataClass]]:
+        """
+        Compile the query once so that it can be run with different
+        parameters, e.g. for clauses added with where("title = ?").  Changes
+        made to the Select afterwards don't affect the prepared query.
+
+        Returns:
+            Callable: A function that takes the parameters, in place of those
+                given to where(), and an optional connection, and returns the
+                results like calling the Select does
+        """
+        statement = self.get_statement()
+        ancestors, references, attached = (
+            self.ancestors,
+            self.references,
+            self._attached,
+        )
+        to_sql_parameters = self.orm._to_sql_parameters
+
+        def run(
+            parameters: tuple[SQLParameter, ...] = (),
+            connection: ConnectionContextMgr | None = None,
+        ) -> Iterator[DataClass]:
+            converted = tuple(to_sql_parameters(parameters))
+            return self._execute(
+                statement, converted, connection, ancestors, references, attached
+            )
+
+        return run
 
     def __call__(
         self,
         connection: ConnectionContextMgr | None = None,
     ) -> Iterator[DataClass]:
-        with self.orm.connection_context(connection) as con:
-            cursor = con.cursor()
-            cursor.execute(self.get_statement(), tuple(self.parameters))
-            data = cursor.fetchall()
+        # The results are produced lazily, so they are bound to a snapshot
+        # of the parameters rather than to the list itself.
+        return self._execute(
+            self.get_statement(),
+            self._compiled_parameters,
+            connection,
+            self.ancestors,
+            self.references,
+            self._attached,
+        )
+
+    def _execute(
+        self,
+        statement: str,
+        parameters: tuple[SQLParameter, ...],
+        connection: ConnectionContextMgr | None,
+        ancestors: str | None,
+        references: tuple[str, ...],
+        attached: tuple[AttachedReference, ...],
+    ) -> Iterator[DataClass]:
+        if ancestors is not None:
+            return iter(
+                self.orm._read_with_ancestors(
+                    statement,
+                    parameters,
+                    self.dataclass,
+                    self.fields,
+                    ancestors,
+                    connection,
+                    references,
+                )
+            )
+
+        return self.orm._stream_instances(
+            statement,
+            parameters,
+            self.dataclass,
+            self.fields,
+            connection,
+            references=references,
+            attached=attached,
+        )
+
+
+@functools.lru_cache(maxsize=256)
+def compile_select(
+    table: str,
+    columns: str,
+    joins: tuple[tuple[str, str, str, str], ...],
+    where_clauses: tuple[str, ...],
+) -> str:
+    """
+    Build a SELECT statement.  Statements are cached by shape so that
+    Selects that build the same query share one statement.
+    Args:
+        table (str): The table being selected from
+        columns (str): Comma separated list of columns to select
+        joins (tuple): (table, alias, attribute, other_attribute) for each join
+        where_clauses (tuple[str, ...]): Clauses that are combined with AND
+
+    Returns:
+        str: The SELECT statement
+    """
+    # Joins can produce duplicate rows, so joined selects use DISTINCT.
+    parts = [("SELECT", "SELECT DISTINCT")[bool(joins)], columns, "FROM", table]
+
+    parts.extend(
+        "JOIN %s %s ON %s.%s = %s.%s"
+        % (join_table, alias, table, attribute, alias, other_attribute)
+        for join_table, alias, attribute, other_attribute in joins
+    )
+
+    if where_clauses:
+        parts.extend(("WHERE", " AND ".join(where_clauses)))
 
-        return self.orm._query_results_to_instances(data, self.dataclass, self.fields)
+    return " ".join(parts)
+
+
+@functools.lru_cache(maxsize=256)
+def _row_type(columns: tuple[str, ...]) -> Callable[..., tuple]:
+    names = [column.replace(".", "_") for column in columns]
+    return namedtuple("Row", names, rename=True)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_ancestors(
+    statement: str,
+    table: str,
+    columns: str,
+    ancestor_columns: str,
+    attribute: str,
+) -> str:
+    """
+    Build a recursive query that returns the rows selected by a statement
+    followed by their ancestors.  Each row ends with a column that's 1 for
+    the selected rows and 0 for the ancestors.
+    Args:
+        statement (str): The SELECT statement for the rows
+        table (str): The table being selected from
+        columns (str): Comma separated list of the columns of the statement
+        ancestor_columns (str): The same columns qualified with "ancestor"
+        attribute (str): The column referring to the parent row
+
+    Returns:
+        str: The WITH RECURSIVE statement
+    """
+    # UNION rather than UNION ALL removes duplicates, so a cycle of
+    # references ends the recursion.
+    return (
+        f"WITH RECURSIVE ancestors({columns}, {DCORM_MATCHED}) AS ("
+        f"SELECT *, 1 FROM ({statement}) "
+        f"UNION SELECT {ancestor_columns}, 0 FROM {table} ancestor "
+        f"JOIN ancestors ON ancestor.{SQLITE_ROWID} = ancestors.{attribute}"
+        f") SELECT * FROM ancestors"
+    )
+
+
+def iter_rows(cursor: Cursor, batch_size: int = FETCH_BATCH_SIZE) -> Iterator[tuple]:
+    size = min(FIRST_FETCH_BATCH_SIZE, batch_size)
+    while batch := cursor.fetchmany(size):
+        yield from batch
+        size = batch_size
 
 
 def execute_with_parameters(
-    connection: Connection, single_query: str, parameters: Tuple[SQLParameter, ...]
+    cursor: Cursor, single_query: str, parameters: Tuple[SQLParameter, ...]
 ) -> KeyType | None:
-    cursor = connection.cursor()
     cursor.execute(single_query, parameters)
 
     lastrowid = cursor.lastrowid
     return KeyType(lastrowid) if lastrowid is not None else None
 
 
+def insert_with_parameters(
+    cursor: Cursor, insert_query: str, parameters: Tuple[SQLParameter, ...]
+) -> KeyType | None:
+    if not SQLITE_HAS_RETURNING:
+        return execute_with_parameters(cursor, insert_query, parameters)
+
+    # The INSERT statement has a RETURNING clause that reports the rowid.
+    cursor.execute(insert_query, parameters)
+    rows = cursor.fetchall()
+    return KeyType(cast(int, rows[0][0])) if rows else None
+
+
 def get_instance_fields(
     instance_or_class: DataClass | DataClassType,
 ) -> tuple[str, tuple[Field, ...]]:
@@ -639,16 +1919,25 @@ def get_instance_fields(
             f"{type(instance_or_class)} hasn't been decorated with @dataclass"
         )
 
+    # Identifiers are interned since they're used to build (and key) the
+    # cached SQL statements.
     cls = get_class(instance_or_class)
-    fields = [
-        Field(name=k, type_hint=v, non_null_type=resolve_type(v))
-        for k, v in get_type_hints(cls).items()
-    ]
+    fields = []
+    for k, v in get_type_hints(cls).items():
+        non_null_type = resolve_type(v)
+        fields.append(
+            Field(
+                name=sys.intern(k),
+                type_hint=v,
+                non_null_type=non_null_type,
+                nullable=non_null_type is not v,
+            )
+        )
     if len(fields) == 0:
         raise ValueError(f"{instance_or_class} has no fields.")
 
     # Use the class name as the table name
-    table = cls.__name__
+    table = sys.intern(cls.__name__)
     return table, tuple(fields)
 
 
@@ -660,12 +1949,13 @@ def get_class(instance_or_class: DataClass | DataClassType) -> DataClassType:
     return cls
 
 
+@functools.lru_cache(maxsize=None)
 def resolve_type(cls: DataClassType):
     if type(cls) is UnionType or cls.__name__ == "Optional":
         types = get_args(cls)
-        if len(types) > 2 or NoneType not in types:
+        if len(types) != 2 or NoneType not in types:
             raise TypeError(f"{cls}: Union type must be NoneType and one other type")
-        return next(filter(lambda t: t != NoneType, types))
+        return types[0] if types[1] is NoneType else types[1]
     else:
         return cls
 
@@ -689,6 +1979,15 @@ def comma_separated_names(
         return names
 
 
+# The dataclass fields of each class used by find_field(), keyed by name.
+# find_field() is shared by the query builders in dcorm.queries and
+# dcorm.experimental.query.
+# Weak keys let classes that are no longer used be reclaimed.
+_FIELDS_BY_NAME: weakref.WeakKeyDictionary[
+    type, dict[str, dataclasses.Field]
+] = weakref.WeakKeyDictionary()
+
+
 def find_field(name: str, dataclass: DataClassType):
     """
     Args:
@@ -701,12 +2000,17 @@ def find_field(name: str, dataclass: DataClassType):
     Returns:
         Field: The dataclass field.
     """
-    field = next(filter(lambda f: f.name == name, dataclasses.fields(dataclass)), None)
-    if field is None:
+    fields_by_name = _FIELDS_BY_NAME.get(dataclass)
+    if fields_by_name is None:
+        fields_by_name = _FIELDS_BY_NAME[dataclass] = {
+            f.name: f for f in dataclasses.fields(dataclass)
+        }
+
+    try:
+        return fields_by_name[name]
+    except KeyError:
         raise ValueError(f"{name} is not a field of {dataclass}")
 
-    return field
-
 
 def validate_join_arguments(
     attribute: str | None,
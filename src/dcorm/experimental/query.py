@@ -1,6 +1,5 @@
-import dataclasses
 from dcorm.connection_pool import ConnectionContextMgr
-from dcorm.dcorm import ORM, SQLITE_ROWID, comma_separated_names
+from dcorm.dcorm import ORM, SQLITE_ROWID, comma_separated_names, find_field
 from dcorm.types import DataClass, DataClassType, Field, SQLParameter
 
 
@@ -171,7 +170,7 @@ class Select:
             # Treat the select just like a table.
             select_statement = dataclass_or_select.get_statement()
             self.join_tables.append(f"( {select_statement} )")
-            self.parameters = dataclass_or_select.parameters + self.parameters
+            self.parameters[:0] = dataclass_or_select.parameters
         else:
             self.join_tables.append(join_table)
 
@@ -223,20 +222,3 @@ def validate_join_arguments(
         raise ValueError(
             '"otherclass_attribute" cannot be specified without "dataclass_or_select"'
         )
-
-
-def find_field(name: str, dataclass: DataClassType):
-    """
-    Args:
-        name (str): Field name
-        dataclass (DataClass): DataClass having `name` as a member
-    Raises:
-        ValueError: Raised if `name` is not an attribute of dataclass
-    Returns:
-        Field: The dataclass field.
-    """
-    field = next(filter(lambda f: f.name == name, dataclasses.fields(dataclass)), None)
-    if field is None:
-        raise ValueError(f"{name} is not a field of {dataclass}")
-
-    return field
@@ -1,12 +1,12 @@
 from __future__ import annotations
 
-import dataclasses
 from typing import Any, Iterable
 
 from dcorm.dcorm import (
     ORM,
     SQLITE_ROWID,
-    comma_separated_names,
+    compile_select,
+    find_field,
 )
 from dcorm.types import (
     DataClass,
@@ -18,25 +18,6 @@ from dcorm.types import (
 from dcorm.connection_pool import ConnectionContextMgr
 
 
-def find_field(name: str, dataclass: DataClassType):
-    """
-    Args:
-        name (str): Field name
-        dataclass (DataClass): DataClass having `name` as a member
-
-    Raises:
-        ValueError: Raised if `name` is not an attribute of dataclass
-
-    Returns:
-        Field: The dataclass field.
-    """
-    field = next(filter(lambda f: f.name == name, dataclasses.fields(dataclass)), None)
-    if field is None:
-        raise ValueError(f"{name} is not a field of {dataclass}")
-
-    return field
-
-
 def validate_join_arguments(
     attribute: str | None,
     dataclass_or_select: DataClass | Select | None,
@@ -60,12 +41,8 @@ class Select:
     table: str
     fields: tuple[Field, ...]
 
-    # All of the join lists must have the same length
-    join_attributes: list[str]
-    join_aliases: list[str]
-    join_tables: list[str]
-    join_other_attributes: list[str]
-    join_other_aliases: list[str]
+    # (table, alias, attribute, other_attribute) for each join
+    joins: list[tuple[str, str, str, str]]
 
     where_clauses: list[str]
     parameters: list[Any]
@@ -74,10 +51,7 @@ class Select:
         self.orm = orm
         self.dataclass = dataclass
         self.table, self.fields = orm._get_class_fields(dataclass)
-        self.join_attributes = []
-        self.join_tables = []
-        self.join_aliases = []
-        self.join_other_attributes = []
+        self.joins = []
         self.where_clauses = []
         self.parameters = []
 
@@ -103,18 +77,25 @@ class Select:
         # type of the field pointed to by the first attribute, however,
         # we don't allow the other attribute to be used in this case.
 
-        # Most of these calls have side effect on self.join_attributes,
-        # self.join_tables, self.join_alias, and self.join_other_attributes.
-        left_type = self._get_left_join_type(attribute)
+        left_type, left_column = self._get_left_join_type(attribute)
         other_class = self._get_other_join_class(dataclass_or_select, left_type)
-        self._handle_right_join_type(left_type, other_class, other_attribute)
+        right_column = self._handle_right_join_type(
+            left_type, other_class, other_attribute
+        )
 
         join_table = self._get_join_table(other_class)
 
         # Set an alias for the table/select being joined.  The select *must*
         # have an alias!
-        self.join_aliases.append(attribute if attribute else join_table)
-        self._add_to_join_table(join_table, dataclass_or_select)
+        alias = attribute if attribute else join_table
+        self.joins.append(
+            (
+                self._add_to_join_table(join_table, dataclass_or_select),
+                alias,
+                left_column,
+                right_column,
+            )
+        )
 
         return self
 
@@ -132,57 +113,33 @@ class Select:
     def where_equal(self, attribute: str, other: Any) -> Select:
         field = find_field(attribute, self.dataclass)
         if type(other) == field.type:
-            converted_other = self.orm.sql_converter.unstructure(other)
-            self.where_clauses.append(f"{attribute} = {converted_other}")
+            # The value is bound as a parameter rather than written into the
+            # clause, as in dcorm.dcorm.
+            self.where_clauses.append(f"({attribute} = ?)")
+            self.parameters.append(self.orm.sql_converter.unstructure(other))
         else:
             raise ValueError(f"Types {field.type} and {type(other)} are not compatible")
 
         return self
 
     def get_statement(self) -> str:
-        if len(self.join_attributes) > 0:
-            has_join = True
-        else:
-            has_join = False
-
-        columns = comma_separated_names(
-            self.fields, table=(self.table if has_join else None)
+        # The statement is built by the same cached function as the Select
+        # in dcorm.dcorm, so that selects with the same shape share it.
+        has_join = bool(self.joins)
+        columns = self.orm._get_columns(
+            self.dataclass, table=(self.table if has_join else None)
+        )
+        return compile_select(
+            self.table, columns, tuple(self.joins), tuple(self.where_clauses)
         )
-
-        join_list = []
-        for table, alias, attribute, other_attribute in zip(
-            self.join_tables,
-            self.join_aliases,
-            self.join_attributes,
-            self.join_other_attributes,
-        ):
-            join_list.append(
-                f"JOIN {table} {alias} "
-                f"ON {self.table}.{attribute} = {alias if alias else table}.{other_attribute}"
-            )
-        joins = " ".join(join_list)
-
-        where_clause = " AND ".join(self.where_clauses)
-        where = "WHERE" if where_clause else ""
-
-        if has_join:
-            distinct = "DISTINCT"
-        else:
-            distinct = ""
-
-        select = f"SELECT {distinct} {columns} FROM {self.table} {joins} {where} {where_clause}"
-        return select
 
     # Determine the left type:
-    def _get_left_join_type(self, attribute: str | None) -> DataClassType:
+    def _get_left_join_type(self, attribute: str | None) -> tuple[DataClassType, str]:
         if attribute is None:
-            self.join_attributes.append(SQLITE_ROWID)
-            left_type = self.dataclass
-        else:
-            self.join_attributes.append(attribute)
-            field = find_field(attribute, self.dataclass)
-            left_type = field.type
-        return left_type
+            return self.dataclass, SQLITE_ROWID
+
+        field = find_field(attribute, self.dataclass)
+        return field.type, attribute
 
     def _get_other_join_class(
         self,
@@ -212,28 +169,28 @@ class Select:
 
     def _add_to_join_table(
         self, join_table: str, dataclass_or_select: DataClass | Select | None
-    ):
-        # Add table or select to self.join_tables
+    ) -> str:
+        # Return the table or select to join to
         if dataclass_or_select is not None and isinstance(dataclass_or_select, Select):
             # Treat the select just like a table.
             select_statement = dataclass_or_select.get_statement()
-            self.join_tables.append(f"( {select_statement} )")
-            self.parameters = dataclass_or_select.parameters + self.parameters
+            self.parameters[:0] = dataclass_or_select.parameters
+            return f"( {select_statement} )"
         else:
-            self.join_tables.append(join_table)
+            return join_table
 
     def _handle_right_join_type(
         self,
         left_type: DataClassType,
         other_class: DataClassType,
         other_attribute: str | None,
-    ):
+    ) -> str:
         # Determine the right type
         if other_attribute is None:
-            self.join_other_attributes.append(SQLITE_ROWID)
+            right_column = SQLITE_ROWID
             right_type = other_class
         else:
-            self.join_other_attributes.append(other_attribute)
+            right_column = other_attribute
             other_field = find_field(other_attribute, other_class)
             right_type = other_field.type
 
@@ -242,13 +199,17 @@ class Select:
                 f"The type of the left side of the join is {left_type} but the "
                 f"type of the right side of the join is {right_type}"
             )
+        return right_column
 
     def __call__(
         self,
         connection: ConnectionContextMgr | None = None,
     ) -> Iterable[DataClass]:
-        with self.orm.connection_context(connection) as con:
-            cursor = con.cursor()
+        # The checkout's cursor returns plain tuples, which the row builder
+        # reads by position, whatever the connection's row_factory is.
+        connection = self.orm.connection_context(connection, readonly=True)
+        with connection:
+            cursor = connection.cursor()
             cursor.execute(self.get_statement(), tuple(self.parameters))
             data = cursor.fetchall()
 
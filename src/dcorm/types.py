@@ -28,6 +28,8 @@ SQLParameter = int | float | str | dt.datetime | dt.date | DataClass
 
 
 class Cursor(Protocol):
+    row_factory: Callable[[Cursor, tuple], Any] | None
+
     @property
     def lastrowid(self) -> int | None:
         ...
@@ -46,6 +48,9 @@ class Cursor(Protocol):
     def fetchall(self) -> list[tuple[object]]:
         ...
 
+    def fetchmany(self, size: int = 1, /) -> list[tuple[object]]:
+        ...
+
 
 class Connection(Protocol):
     def cursor(self, cursorClass: None = None) -> Cursor:
@@ -58,6 +63,10 @@ class Connection(Protocol):
         ...
 
 
+# Connections may be used from any thread that uses the pool, so factories
+# for sqlite3 connections should pass check_same_thread=False to connect().
+# Every ORM class contributes several statements, so it also helps to raise
+# the statement cache above its default of 128, e.g. cached_statements=256.
 ConnectionFactory = Callable[[], Connection]
 
 
@@ -66,8 +75,10 @@ class KeyType(int):
 
 
 # Type definitions
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Field:
     name: str
     type_hint: type
+    # The type with any Optional or `| None` stripped off
     non_null_type: type
+    nullable: bool = False
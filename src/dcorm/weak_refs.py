@@ -1,46 +1,74 @@
-from collections import namedtuple
-
 from typing import Any, Dict
 import weakref
 
-# Until dataclasses with slots are more widely available,
-# a namedtuple is used here to keep the memory footprint small.
-ObjectData = namedtuple("ObjectData", ["weakref", "data"])
+
+class _KeyRef(weakref.ref):
+    # The reference doubles as the dictionary entry.  It remembers the id
+    # of its referent so the removal callback can find the entry after the
+    # object is gone, and it carries the stored data.
+    __slots__ = ("oid", "data")
+
+    oid: int
+    data: Any
 
 
 class WeakKeyDict:
+    __slots__ = ("data", "_remove")
+
     # The keys are the object ids returned by id().
-    # The values are instances of ObjectData.
-    data: Dict[int, ObjectData]
+    # The values are instances of _KeyRef.
+    data: Dict[int, _KeyRef]
 
     def __init__(self):
         self.data = {}
+        # A single callback shared by all of the references, rather than
+        # a new closure for each insertion.
+        self._remove = self._make_remove_callback()
 
-    def __setitem__(self, instance: object, data: Any):
-        oid = id(instance)
+    # weakref.WeakKeyDictionary can't be used instead because it hashes its
+    # keys, and dataclasses that compare by value are unhashable.
 
-        def callback(ref):
-            if self.data[oid].weakref is ref:
-                del self.data[oid]
+    def _make_remove_callback(self):
+        # The dict methods are bound up front so that the callback, which
+        # runs for every collected key, doesn't look them up each time.
+        get = self.data.get
+        delete = self.data.__delitem__
+
+        def remove(ref: _KeyRef):
+            entry = get(ref.oid)
+            if entry is ref:
+                delete(ref.oid)
             else:
                 raise RuntimeError(
-                    f"Ref in callback {ref} doesn't match stored ref {self.data[oid].weakref}"
+                    f"Ref in callback {ref} doesn't match stored ref {entry}"
                 )
 
-        ref = weakref.ref(instance, callback)
-        self.data[oid] = ObjectData(weakref=ref, data=data)
+        return remove
 
-    def __contains__(self, instance: object):
+    def __setitem__(self, instance: object, data: Any):
         oid = id(instance)
+        ref = _KeyRef(instance, self._remove)
+        ref.oid = oid
+        ref.data = data
+        self.data[oid] = ref
 
-        return oid in self.data and (self.data[oid].weakref() is not None)
+    def __contains__(self, instance: object):
+        return (ref := self.data.get(id(instance))) is not None and ref() is not None
 
     def __getitem__(self, instance: object) -> Any:
-        object_data = self.data[id(instance)]
-        if object_data.weakref() is not None:
-            return object_data.data
+        ref = self.data[id(instance)]
+        if ref() is not None:
+            return ref.data
         else:
             return None
 
+    def setdefault(self, instance: object, default: Any) -> Any:
+        ref = self.data.get(id(instance))
+        if ref is not None and ref() is not None:
+            return ref.data
+
+        self[instance] = default
+        return default
+
     def __len__(self):
         return len(self.data)
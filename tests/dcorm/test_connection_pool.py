@@ -6,8 +6,13 @@ from dcorm.connection_pool import ConnectionPool
 
 
 class MockCursor:
+    executed: list[str]
+
+    def __init__(self, executed: list[str]):
+        self.executed = executed
+
     def execute(self, sql: str, parameters: Tuple[object, ...] = ()):
-        pass
+        self.executed.append(sql)
 
     def executemany(self, sql: str, parameters: Iterable[Tuple[object, ...]]):
         pass
@@ -21,16 +26,18 @@ class MockCursor:
 
 class MockConnection:
     idx: int
+    executed: list[str]
     cursor_called = False
     commit_called = False
     rollback_called = False
 
     def __init__(self, idx: int):
         self.idx = idx
+        self.executed = []
 
     def cursor(self) -> MockCursor:
         self.cursor_called = True
-        return MockCursor()
+        return MockCursor(self.executed)
 
     def commit(self):
         self.commit_called = True
@@ -118,3 +125,83 @@ def test_rollback_called_on_all_pooled_objects(connections, connection_factory):
 
     # We expect rollback() called on first two objects
     assert all([c.rollback_called for c in connections[:2]])
+
+
+def test_pragmas_executed_on_pooled_connections(connections, connection_factory):
+    connections = connections.copy()
+    ConnectionPool(connection_factory, size=2, pragmas=("busy_timeout=5000",))
+
+    assert all(c.executed == ["PRAGMA busy_timeout=5000"] for c in connections[:2])
+
+
+def test_readonly_and_write_connections_are_distinct(connection_factory):
+    cp = ConnectionPool(connection_factory, size=2)
+    with cp.use() as writer, cp.use(readonly=True) as reader:
+        assert writer is not reader
+
+
+def test_commit_not_called_on_readonly_connection(connections, connection_factory):
+    connections = connections.copy()
+    cp = ConnectionPool(connection_factory, size=2)
+
+    with cp.use(readonly=True) as connection:
+        connection.cursor()
+
+    assert not cast(MockConnection, connection).commit_called
+    assert not any(c.rollback_called for c in connections)
+
+
+def test_reentered_connection_commits_only_on_outermost_exit(
+    connections, connection_factory
+):
+    connections = connections.copy()
+    cp = ConnectionPool(connection_factory, size=2)
+
+    context = cp.use()
+    with context:
+        with context as connection:
+            connection.cursor()
+        assert not cast(MockConnection, connection).commit_called
+    assert cast(MockConnection, connection).commit_called
+
+
+def test_checkout_shares_one_cursor(connection_factory):
+    cp = ConnectionPool(connection_factory, size=2)
+
+    context = cp.use()
+    with context:
+        assert context.cursor() is context.cursor()
+
+
+def test_borrowed_writer_returns_to_write_pool(connection_factory):
+    cp = ConnectionPool(connection_factory, size=2)
+    with cp.use() as writer:
+        pass
+
+    # With the reader in use, the next readonly checkout borrows the writer.
+    with cp.use(readonly=True) as reader:
+        with cp.use(readonly=True) as borrowed:
+            assert borrowed is writer
+
+    with cp.use() as connection:
+        assert connection is writer
+    with cp.use(readonly=True) as connection:
+        assert connection is reader
+
+
+def test_on_rollback_called_only_when_rolled_back(connection_factory):
+    cp = ConnectionPool(connection_factory, size=2)
+    undone: list[int] = []
+
+    context = cp.use()
+    with context:
+        context.on_rollback(undone.append, 1)
+    assert undone == []
+
+    context = cp.use()
+    with pytest.raises(ValueError):
+        with context:
+            context.on_rollback(undone.append, 2)
+            context.on_rollback(undone.append, 3)
+            raise ValueError("Some exception")
+    assert undone == [3, 2]
@@ -1,3 +1,5 @@
+import copy
+import dataclasses
 from dataclasses import dataclass
 import datetime as dt
 from typing import Optional, Union
@@ -5,6 +7,12 @@ from zoneinfo import ZoneInfo
 import sqlite3
 
 from dcorm import orm
+from dcorm.dcorm import (
+    DCORM_SQL,
+    FETCH_BATCH_SIZE,
+    FIRST_FETCH_BATCH_SIZE,
+    iter_rows,
+)
 
 import pytest
 
@@ -37,11 +45,12 @@ SOME_OTHER_DATETIME = dt.datetime(
 
 
 EXPECTED_SQLITE_TYPE = {
+    "_rowid_": "INTEGER",
     "an_int": "INTEGER",
     "a_float": "REAL",
     "a_str": "TEXT",
-    "a_date": "TEXT",
-    "a_datetime": "TEXT",
+    "a_date": "INTEGER",
+    "a_datetime": "INTEGER",
     "a_nullable_int": "INTEGER",
     "a_nullable_float": "REAL",
     "a_nullable_string": "TEXT",
@@ -102,15 +111,27 @@ def containing_instance(some_instance):
 
 @pytest.fixture
 def connection():
-    empty_db = sqlite3.connect(":memory:")
+    # Autocommit mode, so that sqlite3 doesn't open transactions implicitly
+    # and the transactions are the ones dcorm begins explicitly.
+    empty_db = sqlite3.connect(":memory:", isolation_level=None)
     return empty_db
 
 
-@pytest.fixture
-def with_tables_created(connection):
-    orm.set_connection_factory(lambda: connection)
+@pytest.fixture(scope="session")
+def schema_snapshot():
+    # The tables are created once per session and copied into each test's
+    # database, which is cheaper than creating them for every test.
+    snapshot = sqlite3.connect(":memory:")
+    orm.set_connection_factory(lambda: snapshot)
     orm.create(SomeDataClass)
     orm.create(ContainingDataClass)
+    return snapshot
+
+
+@pytest.fixture
+def with_tables_created(connection, schema_snapshot):
+    schema_snapshot.backup(connection)
+    orm.set_connection_factory(lambda: connection)
     return connection
 
 
@@ -122,10 +143,10 @@ def with_one_row_inserted(with_tables_created, some_instance):
 
 
 @pytest.fixture
-def with_two_rows_inserted(with_one_row_inserted, some_other_instance):
-    orm.set_connection_factory(lambda: with_one_row_inserted)
-    orm.insert(some_other_instance)
-    return with_one_row_inserted
+def with_two_rows_inserted(with_tables_created, some_instance, some_other_instance):
+    orm.set_connection_factory(lambda: with_tables_created)
+    orm.insert_many([some_instance, some_other_instance])
+    return with_tables_created
 
 
 def test_orm_decorated_class_has_orm_returns_true():
@@ -144,6 +165,13 @@ def test_undecorated_instance_has_orm_returns_false():
     assert orm.has_orm(SomeNonDataClass()) is False  # type: ignore
 
 
+def test_undecorated_subclass_has_orm_returns_false():
+    class SomeSubclass(SomeDataClass):
+        pass
+
+    assert orm.has_orm(SomeSubclass) is False
+
+
 def test_instance_has_expected_fields():
     instance = SomeDataClass(
         SOME_INT,
@@ -163,11 +191,32 @@ def test_instance_has_expected_fields():
     assert instance.a_nullable_string == YET_ANOTHER_STRING
 
 
+def test_connection_factory_is_not_called_until_first_use(
+    connection: sqlite3.Connection,
+):
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return connection
+
+    orm.set_connection_factory(factory)
+    assert calls == []
+    orm.create(SomeDataClass)
+    assert len(calls) > 0
+
+
 def test_create_executes_no_exception(connection: sqlite3.Connection):
     orm.set_connection_factory(lambda: connection)
     orm.create(SomeDataClass)
 
 
+def test_created_class_carries_its_statements(connection: sqlite3.Connection):
+    orm.set_connection_factory(lambda: connection)
+    orm.create(SomeDataClass)
+    assert SomeDataClass.__dict__[DCORM_SQL]["insert"].startswith("INSERT")
+
+
 def test_create_raises_on_non_dataclass(connection: sqlite3.Connection):
     orm.set_connection_factory(lambda: connection)
     with pytest.raises(TypeError):
@@ -184,6 +233,36 @@ def test_columns_have_expected_db_types(with_tables_created):
         assert d["type"] == EXPECTED_SQLITE_TYPE[d["name"]]
 
 
+def test_dates_are_stored_as_integers(
+    with_tables_created: sqlite3.Connection, some_instance: SomeDataClass
+):
+    orm.set_connection_factory(lambda: with_tables_created)
+    id = orm.insert(some_instance)
+    row = with_tables_created.execute(
+        "SELECT typeof(a_date), typeof(a_datetime) FROM SomeDataClass "
+        "WHERE _rowid_ = ?",
+        (id,),
+    ).fetchone()
+    assert row == ("integer", "integer")
+
+
+def test_naive_datetime_is_stored_as_localtime(
+    with_tables_created: sqlite3.Connection, some_instance: SomeDataClass
+):
+    orm.set_connection_factory(lambda: with_tables_created)
+    local_datetime = SOME_DATETIME.astimezone()
+    some_instance.a_datetime = local_datetime.replace(tzinfo=None)
+    id = orm.insert(some_instance)
+    orm.identity_map.clear()
+    assert orm.get_by_id(SomeDataClass, id).a_datetime == local_datetime
+
+
+def test_rowid_is_declared_primary_key(with_tables_created):
+    cursor = with_tables_created.execute("PRAGMA table_info(SomeDataClass)")
+    primary_keys = [row[1] for row in cursor if row[5]]
+    assert primary_keys == ["_rowid_"]
+
+
 def test_create_raises_when_exists(with_tables_created: sqlite3.Connection):
     orm.set_connection_factory(lambda: with_tables_created)
     with pytest.raises(Exception):
@@ -203,6 +282,168 @@ def test_insert(with_tables_created: sqlite3.Connection, some_instance: SomeData
     assert id is not None
 
 
+def test_insert_many_returns_ids_of_stored_records(
+    with_tables_created: sqlite3.Connection,
+    some_instance: SomeDataClass,
+    some_other_instance: SomeDataClass,
+):
+    orm.set_connection_factory(lambda: with_tables_created)
+    ids = orm.insert_many([some_instance, some_other_instance])
+    assert len(ids) == 2
+    assert orm.get_by_id(SomeDataClass, ids[0]) == some_instance
+    assert orm.get_by_id(SomeDataClass, ids[1]) == some_other_instance
+
+
+def test_failed_insert_many_leaves_instances_unstored(
+    with_tables_created: sqlite3.Connection,
+    some_instance: SomeDataClass,
+    some_other_instance: SomeDataClass,
+):
+    # The second insertion fails after the first has succeeded.
+    with_tables_created.execute(
+        f"CREATE TRIGGER reject BEFORE INSERT ON SomeDataClass "
+        f"WHEN NEW.an_int = {SOME_OTHER_INT} BEGIN SELECT RAISE(ABORT, 'reject'); END"
+    )
+    with pytest.raises(sqlite3.DatabaseError):
+        orm.insert_many([some_instance, some_other_instance])
+    with pytest.raises(ValueError):
+        orm.get_rowid(some_instance)
+
+    with_tables_created.execute("DROP TRIGGER reject")
+    orm.insert_many([some_instance, some_other_instance])
+    some_instance.a_str = YET_ANOTHER_STRING
+    orm.update(some_instance)
+    orm.set_connection_factory(lambda: with_tables_created)
+    assert [instance.a_str for instance in orm.get_all(SomeDataClass)] == [
+        YET_ANOTHER_STRING,
+        SOME_OTHER_STRING,
+    ]
+
+
+def test_failed_update_many_doesnt_remember_instances(
+    with_tables_created: sqlite3.Connection,
+    some_instance: SomeDataClass,
+    some_other_instance: SomeDataClass,
+):
+    first_id, _ = orm.insert_many([some_instance, some_other_instance])
+    with_tables_created.execute(
+        "CREATE TRIGGER reject BEFORE UPDATE ON SomeDataClass "
+        "WHEN NEW.an_int = 99 BEGIN SELECT RAISE(ABORT, 'reject'); END"
+    )
+    # The second instance's update fails after the first has been made.
+    some_instance.a_str = YET_ANOTHER_STRING
+    some_other_instance.an_int = 99
+    # The caller's own transaction is rolled back, so the ORM doesn't clear
+    # everything it remembers as transaction() would.
+    connection = orm.connection_context()
+    with pytest.raises(sqlite3.DatabaseError):
+        with connection:
+            connection.cursor().execute("BEGIN")
+            orm.update_many([some_instance, some_other_instance], connection)
+
+    # The read comes from the database rather than the unsaved instance.
+    assert orm.get_by_id(SomeDataClass, first_id).a_str == SOME_STRING
+
+
+def test_update_many_modifies_records(
+    with_tables_created: sqlite3.Connection,
+    some_instance: SomeDataClass,
+    some_other_instance: SomeDataClass,
+):
+    orm.set_connection_factory(lambda: with_tables_created)
+    first_id, second_id = orm.insert_many([some_instance, some_other_instance])
+
+    some_instance.an_int = SOME_OTHER_INT
+    some_other_instance.a_str = YET_ANOTHER_STRING
+    orm.update_many([some_instance, some_other_instance])
+
+    assert orm.get_by_id(SomeDataClass, first_id).an_int == SOME_OTHER_INT
+    assert orm.get_by_id(SomeDataClass, second_id).a_str == YET_ANOTHER_STRING
+
+
+def test_transaction_commits_all_operations(
+    with_tables_created: sqlite3.Connection,
+    some_instance: SomeDataClass,
+    some_other_instance: SomeDataClass,
+):
+    orm.set_connection_factory(lambda: with_tables_created)
+    with orm.transaction() as transaction:
+        orm.insert(some_instance, transaction)
+        orm.insert(some_other_instance, transaction)
+    assert len(list(orm.get_all(SomeDataClass))) == 2
+
+
+def test_transaction_rolls_back_on_exception(
+    with_tables_created: sqlite3.Connection, some_instance: SomeDataClass
+):
+    orm.set_connection_factory(lambda: with_tables_created)
+    with pytest.raises(ValueError):
+        with orm.transaction() as transaction:
+            orm.insert(some_instance, transaction)
+            raise ValueError("Some exception")
+    assert len(list(orm.get_all(SomeDataClass))) == 0
+
+
+def test_rolled_back_instances_can_be_inserted_again(
+    with_tables_created: sqlite3.Connection, containing_instance: ContainingDataClass
+):
+    # Inserting the container inserts its containee on the same connection.
+    with pytest.raises(ValueError):
+        with orm.transaction():
+            orm.insert(containing_instance)
+            raise ValueError("Some exception")
+
+    for instance in (containing_instance, containing_instance.containee):
+        with pytest.raises(ValueError):
+            orm.get_rowid(instance)
+
+    id = orm.insert(containing_instance)
+    orm.set_connection_factory(lambda: with_tables_created)
+    read = orm.get_by_id(ContainingDataClass, id)
+    assert read == containing_instance
+    assert len(list(orm.get_all(SomeDataClass))) == 1
+
+
+def test_operations_in_transaction_use_its_connection(
+    tmp_path, some_instance: SomeDataClass
+):
+    # Without a busy timeout, an insert on any other connection would fail
+    # at once against the transaction's write lock.
+    database = tmp_path / "test.db"
+    orm.set_connection_factory(
+        lambda: sqlite3.connect(database, check_same_thread=False),
+        pragmas=("journal_mode=WAL",),
+    )
+    orm.create(SomeDataClass)
+    with pytest.raises(ValueError):
+        with orm.transaction():
+            orm.insert(some_instance)
+            assert len(list(orm.get_all(SomeDataClass))) == 1
+            raise ValueError("Some exception")
+    assert len(list(orm.get_all(SomeDataClass))) == 0
+
+
+def test_create_all_creates_each_table(connection: sqlite3.Connection):
+    orm.set_connection_factory(lambda: connection)
+    orm.create_all(SomeDataClass, ContainingDataClass)
+    tables = connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name"
+    ).fetchall()
+    assert tables == [("ContainingDataClass",), ("SomeDataClass",)]
+
+
+def test_create_is_rolled_back_with_transaction(connection: sqlite3.Connection):
+    orm.set_connection_factory(lambda: connection)
+    with pytest.raises(ValueError):
+        with orm.transaction() as transaction:
+            orm.create(SomeDataClass, transaction)
+            raise ValueError("Some exception")
+    tables = connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"
+    ).fetchall()
+    assert tables == []
+
+
 def test_whether_order_matters(connection):
     # This tests whether an implementation detail causes a dependence on order.
     # Because of the potential for forward references, descriptors don't get
@@ -237,6 +478,49 @@ def test_whether_order_matters(connection):
     assert instance.foo == foo
 
 
+def test_copy_of_persisted_instance_has_its_own_state(
+    with_tables_created, containing_instance, some_other_instance
+):
+    orm.insert(containing_instance)
+    rowid = orm.get_rowid(containing_instance)
+
+    duplicate = copy.copy(containing_instance)
+    assert duplicate.containee is containing_instance.containee
+    duplicate.containee = some_other_instance
+    orm.insert(duplicate)
+
+    assert orm.get_rowid(duplicate) != rowid
+    assert orm.get_rowid(containing_instance) == rowid
+    assert containing_instance.containee is not some_other_instance
+
+
+def test_frozen_instance_rowid_is_known_after_insert(connection):
+    @orm.orm_dataclass
+    @dataclass(frozen=True)
+    class Frozen:
+        a: int
+
+    orm.set_connection_factory(lambda: connection)
+    orm.create(Frozen)
+    instance = Frozen(a=3)
+    id = orm.insert(instance)
+    assert orm.get_rowid(instance) == id
+    assert orm.get_by_id(Frozen, id) == instance
+
+
+def test_nullable_date_round_trips(connection):
+    @orm.orm_dataclass
+    @dataclass
+    class Event:
+        day: Optional[dt.date]
+
+    orm.set_connection_factory(lambda: connection)
+    orm.create(Event)
+    ids = orm.insert_many([Event(day=None), Event(day=SOME_DATE)])
+    orm.identity_map.clear()
+    assert [orm.get_by_id(Event, id).day for id in ids] == [None, SOME_DATE]
+
+
 def test_read_after_insert_returns_expected_record(
     with_tables_created: sqlite3.Connection, some_instance: SomeDataClass
 ):
@@ -281,6 +565,76 @@ def test_update_modifies_record(
     assert read_instance.a_str == SOME_STRING
 
 
+def test_select_where_converts_date_parameter(
+    with_two_rows_inserted: sqlite3.Connection,
+):
+    query = orm.select(SomeDataClass).where("a_date = ?", (SOME_DATE,))
+    assert len(list(query())) == 1
+
+
+def test_reads_ignore_connection_row_factory(
+    with_tables_created: sqlite3.Connection, some_instance: SomeDataClass
+):
+    orm.set_connection_factory(lambda: with_tables_created)
+    # The inserted instance isn't kept so that it's read from the database.
+    id = orm.insert(dataclasses.replace(some_instance))
+    with_tables_created.row_factory = lambda cursor, row: dict(
+        zip((column[0] for column in cursor.description), row)
+    )
+    assert orm.get_by_id(SomeDataClass, id) == some_instance
+    assert list(orm.get_all(SomeDataClass)) == [some_instance]
+
+
+def test_get_by_id_returns_live_instance_without_query(
+    with_tables_created: sqlite3.Connection, some_instance: SomeDataClass
+):
+    orm.set_connection_factory(lambda: with_tables_created)
+    id = orm.insert(some_instance)
+
+    statements: list[str] = []
+    with_tables_created.set_trace_callback(statements.append)
+    assert orm.get_by_id(SomeDataClass, id) is some_instance
+    assert statements == []
+
+
+def test_get_by_id_reads_record_updated_from_another_instance(
+    with_tables_created: sqlite3.Connection,
+    some_instance: SomeDataClass,
+    some_other_instance: SomeDataClass,
+):
+    orm.set_connection_factory(lambda: with_tables_created)
+    id = orm.insert(some_instance)
+    orm.update_by_id(some_other_instance, id)
+    read_instance = orm.get_by_id(SomeDataClass, id)
+    assert read_instance is not some_instance
+    assert read_instance == some_other_instance
+
+
+def test_refreshed_read_sees_update_from_another_connection(
+    tmp_path, some_instance: SomeDataClass
+):
+    database = tmp_path / "test.db"
+    orm.set_connection_factory(
+        lambda: sqlite3.connect(database, check_same_thread=False)
+    )
+    orm.create(SomeDataClass)
+    id = orm.insert(some_instance)
+
+    other = sqlite3.connect(database)
+    other.execute(
+        "UPDATE SomeDataClass SET a_str = ? WHERE _rowid_ = ?",
+        (SOME_OTHER_STRING, id),
+    )
+    other.commit()
+    other.close()
+
+    # The instance in use is returned until the read is refreshed.
+    assert orm.get_by_id(SomeDataClass, id) is some_instance
+    refreshed = orm.get_by_id(SomeDataClass, id, refresh=True)
+    assert refreshed.a_str == SOME_OTHER_STRING
+    assert orm.get_by_id(SomeDataClass, id) is refreshed
+
+
 def test_read_causes_exception_after_delete_by_id(
     with_tables_created: sqlite3.Connection, some_instance: SomeDataClass
 ):
@@ -308,6 +662,25 @@ def test_get_all_returns_two_instances(with_two_rows_inserted):
     assert len(all_instances) == 2
 
 
+def test_get_all_streams_more_than_one_batch(with_tables_created, some_instance):
+    orm.set_connection_factory(lambda: with_tables_created)
+    orm.insert_many(
+        [dataclasses.replace(some_instance) for _ in range(FETCH_BATCH_SIZE + 1)]
+    )
+    assert sum(1 for _ in orm.get_all(SomeDataClass)) == FETCH_BATCH_SIZE + 1
+
+
+def test_first_rows_fetched_in_small_batch(connection: sqlite3.Connection):
+    cursor = connection.execute(
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n LIMIT 2000) "
+        "SELECT i FROM n"
+    )
+    rows = iter_rows(cursor)
+    assert next(rows) == (1,)
+    # Only the first batch has been read from the cursor.
+    assert cursor.fetchone() == (FIRST_FETCH_BATCH_SIZE + 1,)
+
+
 def test_get_all_instances_of_expected_class(with_two_rows_inserted):
     orm.set_connection_factory(lambda: with_two_rows_inserted)
     all_instances = list(orm.get_all(SomeDataClass))
@@ -350,6 +723,62 @@ def test_containee_autoloads(with_tables_created, containing_instance):
     assert containee is not None and containee.an_int == SOME_INT
 
 
+def test_eager_get_all_reads_containee_with_container(
+    with_tables_created, containing_instance
+):
+    orm.set_connection_factory(lambda: with_tables_created)
+    orm.insert(containing_instance)
+
+    statements: list[str] = []
+    with_tables_created.set_trace_callback(statements.append)
+    (single_instance,) = list(orm.get_all(ContainingDataClass, eager=True))
+    assert single_instance.containee == containing_instance.containee
+    assert len([s for s in statements if s.startswith("SELECT")]) == 1
+
+
+def test_eager_get_by_id_reads_missing_containee_as_none(with_tables_created):
+    orm.set_connection_factory(lambda: with_tables_created)
+    # The inserted instance isn't kept so that it's read from the database.
+    id = orm.insert(ContainingDataClass(a=13, containee=None))
+    read_instance = orm.get_by_id(ContainingDataClass, id, eager=True)
+    assert read_instance == ContainingDataClass(a=13, containee=None)
+
+
+def test_updating_read_container_does_not_read_containee(
+    with_tables_created, some_instance
+):
+    orm.set_connection_factory(lambda: with_tables_created)
+    # The containee isn't kept, so it can only be read from the database.
+    orm.insert(ContainingDataClass(a=13, containee=dataclasses.replace(some_instance)))
+    (container,) = list(orm.get_all(ContainingDataClass))
+
+    statements: list[str] = []
+    with_tables_created.set_trace_callback(statements.append)
+    container.a = 14
+    orm.update(container)
+    assert not [s for s in statements if s.startswith("SELECT")]
+
+
+def test_containers_share_containee_read_once(with_tables_created, some_instance):
+    orm.set_connection_factory(lambda: with_tables_created)
+    # The containee isn't kept, so it can only be read from the database.
+    containee = dataclasses.replace(some_instance)
+    orm.insert_many(
+        [
+            ContainingDataClass(a=13, containee=containee),
+            ContainingDataClass(a=14, containee=containee),
+        ]
+    )
+    del containee
+    first, second = orm.get_all(ContainingDataClass)
+
+    statements: list[str] = []
+    with_tables_created.set_trace_callback(statements.append)
+    assert first.containee is first.containee
+    assert second.containee is first.containee
+    assert len([s for s in statements if s.startswith("SELECT")]) == 1
+
+
 def test_can_insert_when_containee_is_none(with_tables_created):
     orm.set_connection_factory(lambda: with_tables_created)
     orm.insert(ContainingDataClass(a=13, containee=None))
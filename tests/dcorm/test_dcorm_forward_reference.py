@@ -9,9 +9,15 @@ from dcorm.types import Connection
 import pytest
 
 
+# slots=True with weakref_slot=True needs Python 3.11, so the weak reference
+# slot comes from a base class instead.
+class WeakReferenceable:
+    __slots__ = ("__weakref__",)
+
+
 @orm.orm_dataclass
-@dataclass
-class SelfReference:
+@dataclass(slots=True)
+class SelfReference(WeakReferenceable):
     name: str
     parent: SelfReference | None = None
     a_nullable_int: int | None = None
@@ -38,16 +44,30 @@ def test_instance_has_expected_set_values():
     assert instance.a_nullable_int_with_integer_default == 19
 
 
+def test_instance_has_no_dict():
+    assert not hasattr(SelfReference("foo"), "__dict__")
+
+
 @pytest.fixture
 def connection():
     empty_db = sqlite3.connect(":memory:")
     return empty_db
 
 
+@pytest.fixture(scope="session")
+def schema_snapshot():
+    # The table is created once per session and copied into each test's
+    # database.
+    snapshot = sqlite3.connect(":memory:")
+    orm.set_connection_factory(lambda: snapshot)
+    orm.create(SelfReference)
+    return snapshot
+
+
 @pytest.fixture
-def with_tables_created(connection):
+def with_tables_created(connection, schema_snapshot):
+    schema_snapshot.backup(connection)
     orm.set_connection_factory(lambda: connection)
-    orm.create(SelfReference)
     return connection
 
 
@@ -78,27 +98,53 @@ def test_inserted_child_is_retrievable(with_tables_created: sqlite3.Connection):
     child.parent = parent
 
     # This should insert both the parent and the child
-    orm.set_connection_factory(lambda: with_tables_created)
     id = orm.insert(child)
     instance = orm.get_by_id(SelfReference, id)
     assert instance.name == "child"  # type: ignore
 
 
 def test_with_parent_and_child_inserted_has_two_records(with_parent_and_child_inserted):
-    orm.set_connection_factory(lambda: with_parent_and_child_inserted)
     all_instances = list(orm.get_all(SelfReference))
     assert len(all_instances) == 2
 
 
 def test_can_select_child(with_parent_and_child_inserted):
-    orm.set_connection_factory(lambda: with_parent_and_child_inserted)
     query = orm.select(SelfReference).where("name = ?", ("child",))
     child = cast(SelfReference, list(query())[0])
     assert child.name == "child"
 
 
 def test_queried_child_can_resolve_parent(with_parent_and_child_inserted):
-    orm.set_connection_factory(lambda: with_parent_and_child_inserted)
     query = orm.select(SelfReference).where("name = ?", ("child",))
     child = cast(SelfReference, list(query())[0])
     assert child.parent is not None and child.parent.name == "parent"
+
+
+def test_can_select_child_by_joining_parent(with_parent_and_child_inserted):
+    query = (
+        orm.select(SelfReference).join("parent").where("parent.name = ?", ("parent",))
+    )
+    (child,) = cast(list[SelfReference], list(query()))
+    assert child.name == "child"
+
+
+def test_select_with_ancestors_reads_parent_chain_in_one_query(with_tables_created):
+    grandparent = SelfReference(name="grandparent")
+    parent = SelfReference(name="parent", parent=grandparent)
+    orm.insert(SelfReference(name="child", parent=parent))
+    del grandparent, parent
+
+    statements: list[str] = []
+    with_tables_created.set_trace_callback(statements.append)
+    query = orm.select(SelfReference).where("name = ?", ("child",))
+    (child,) = cast(list[SelfReference], list(query.with_ancestors("parent")()))
+    assert child.parent is not None and child.parent.name == "parent"
+    assert child.parent.parent is not None
+    assert child.parent.parent.name == "grandparent"
+    assert child.parent.parent.parent is None
+    assert len(statements) == 1
+
+
+def test_with_ancestors_raises_with_non_self_reference():
+    with pytest.raises(ValueError):
+        orm.select(SelfReference).with_ancestors("name")
@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+import sqlite3
+
+from dcorm import orm
+
+
+@orm.orm_dataclass
+@dataclass
+class Record:
+    a: int
+
+
+def test_wal_set(tmp_path):
+    database = tmp_path / "test.db"
+    orm.set_connection_factory(
+        lambda: sqlite3.connect(database, check_same_thread=False)
+    )
+    orm.create(Record)
+    orm.insert(Record(a=1))
+
+    # WAL mode is persistent, so a connection that didn't come from the pool
+    # sees it too.
+    connection = sqlite3.connect(database)
+    assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    connection.close()
+
+
+def test_file_backed_connection_has_tuning_pragmas(tmp_path):
+    database = tmp_path / "test.db"
+    orm.set_connection_factory(
+        lambda: sqlite3.connect(database, check_same_thread=False)
+    )
+    with orm.connection_context() as connection:
+        cursor = connection.cursor()
+        assert cursor.execute("PRAGMA synchronous").fetchone() == (1,)
+        assert cursor.execute("PRAGMA temp_store").fetchone() == (2,)
+
+
+def test_page_cache_is_limited_by_default(tmp_path):
+    database = tmp_path / "test.db"
+    orm.set_connection_factory(
+        lambda: sqlite3.connect(database, check_same_thread=False)
+    )
+    with orm.connection_context() as connection:
+        cursor = connection.cursor()
+        assert cursor.execute("PRAGMA cache_size").fetchone() == (-64000,)
+
+
+def test_pragmas_can_be_replaced(tmp_path):
+    database = tmp_path / "test.db"
+    orm.set_connection_factory(
+        lambda: sqlite3.connect(database, check_same_thread=False),
+        pragmas=("cache_size=-256000",),
+    )
+    with orm.connection_context() as connection:
+        cursor = connection.cursor()
+        assert cursor.execute("PRAGMA cache_size").fetchone() == (-256000,)
@@ -4,17 +4,24 @@ import sqlite3
 from typing import cast
 
 from dcorm import orm
+from dcorm import queries
+
+
+# slots=True with weakref_slot=True needs Python 3.11, so the weak reference
+# slot comes from a base class instead.
+class WeakReferenceable:
+    __slots__ = ("__weakref__",)
 
 
 @orm.orm_dataclass
-@dataclass
-class Foo:
+@dataclass(slots=True)
+class Foo(WeakReferenceable):
     a: int
 
 
 @orm.orm_dataclass
-@dataclass
-class Bar:
+@dataclass(slots=True)
+class Bar(WeakReferenceable):
     b: int
     some_foo: Foo
 
@@ -24,52 +31,55 @@ def empty_db():
     return sqlite3.connect(":memory:")
 
 
-@pytest.fixture
-def tables_created(empty_db):
-    orm.set_connection_factory(lambda: empty_db)
+@pytest.fixture(scope="session")
+def relations_snapshot():
+    # The tables are created and populated once per session and copied
+    # into each test's database.
+    snapshot = sqlite3.connect(":memory:")
+    orm.set_connection_factory(lambda: snapshot)
     orm.create(Foo)
     orm.create(Bar)
-    return empty_db
-
-
-@pytest.fixture
-def relations_inserted(tables_created):
-    orm.set_connection_factory(lambda: tables_created)
     # Insert two Foo records and
     # Two sets of two Bar records with each
     # set of Bar records pointing at a different
     # Foo record.
-    for a in range(2):
-        foo = Foo(a=a)
-        orm.insert(foo)
-        for b in range(2):
-            bar = Bar(b=b, some_foo=foo)
-            orm.insert(bar)
-    return tables_created
+    foos = [Foo(a=a) for a in range(2)]
+    orm.insert_many(foos + [Bar(b=b, some_foo=foo) for foo in foos for b in range(2)])
+    return snapshot
+
+
+@pytest.fixture
+def relations_inserted(empty_db, relations_snapshot):
+    relations_snapshot.backup(empty_db)
+    orm.set_connection_factory(lambda: empty_db)
+    return empty_db
+
+
+def test_queries_select_ignores_connection_row_factory(relations_inserted):
+    relations_inserted.row_factory = lambda cursor, row: dict(
+        zip((column[0] for column in cursor.description), row)
+    )
+    foos = cast(list[Foo], list(queries.Select(orm, Foo)()))
+    assert sorted(foo.a for foo in foos) == [0, 1]
 
 
 def test_relations_inserted_has_two_foo_records(relations_inserted):
-    orm.set_connection_factory(lambda: relations_inserted)
     assert len(list(orm.get_all(Foo))) == 2
 
 
 def test_relations_inserted_has_four_bar_records(relations_inserted):
-    orm.set_connection_factory(lambda: relations_inserted)
     assert len(list(orm.get_all(Bar))) == 4
 
 
 def test_empty_select_foo_returns_two_records(relations_inserted):
-    orm.set_connection_factory(lambda: relations_inserted)
     assert len(list(orm.select(Foo)())) == 2
 
 
 def test_empty_select_bar_returns_four_records(relations_inserted):
-    orm.set_connection_factory(lambda: relations_inserted)
     assert len(list(orm.select(Bar)())) == 4
 
 
 def test_select_bar_join_foo_returns_four_records(relations_inserted):
-    orm.set_connection_factory(lambda: relations_inserted)
     assert len(list(orm.select(Bar).join("some_foo")())) == 4
 
 
@@ -84,14 +94,12 @@ def test_select_bar_join_foo_raises_with_non_dataclass_field():
 
 
 def test_select_bar_join_foo_where_specific_foo_returns_two_records(relations_inserted):
-    orm.set_connection_factory(lambda: relations_inserted)
     query = orm.select(Bar).join("some_foo").where("some_foo.a = 1")
     results = list(query())
     assert len(results) == 2
 
 
 def test_select_bar_join_foo_by_joining_select(relations_inserted):
-    orm.set_connection_factory(lambda: relations_inserted)
     selected_foo = orm.select(Foo).where("Foo.a = 1")
     query = orm.select(Bar).join("some_foo", selected_foo)
     results = list(query())
@@ -109,8 +117,75 @@ def test_select_bar_join_bar_on_some_foo_raises_type_error():
 def test_select_bar_join_foo_where_specific_foo_returns_correct_records(
     relations_inserted,
 ):
-    orm.set_connection_factory(lambda: relations_inserted)
     query = orm.select(Bar).join("some_foo").where("some_foo.a = 1")
     results = cast(list[Bar], list(query()))
     assert results[0].some_foo.a == 1
     assert results[1].some_foo.a == 1
+
+
+def test_get_statement_reflects_where_added_after_compiling():
+    query = orm.select(Bar)
+    assert "WHERE" not in query.get_statement()
+    query.where("Bar.b = 1")
+    assert "WHERE" in query.get_statement()
+
+
+def test_selects_with_same_shape_share_statement():
+    first = orm.select(Bar).join("some_foo").where("some_foo.a = ?", (1,))
+    second = orm.select(Bar).join("some_foo").where("some_foo.a = ?", (2,))
+    assert first.get_statement() is second.get_statement()
+
+
+def test_select_uses_parameters_added_after_first_call(relations_inserted):
+    query = orm.select(Bar).join("some_foo")
+    assert len(list(query())) == 4
+    query.where("some_foo.a = ?", (1,))
+    assert len(list(query())) == 2
+
+
+def test_where_on_one_select_does_not_change_another():
+    first = orm.select(Bar)
+    second = orm.select(Bar)
+    first.join("some_foo").where("some_foo.a = ?", (1,))
+    assert second.get_statement() == orm.select(Bar).get_statement()
+    assert "WHERE" not in second.get_statement()
+    assert len(second.parameters) == 0
+
+
+def test_eager_select_reads_references_in_one_query(relations_inserted):
+    statements: list[str] = []
+    relations_inserted.set_trace_callback(statements.append)
+    bars = list(orm.select(Bar).eager("some_foo")())
+    assert sorted(bar.some_foo.a for bar in bars) == [0, 0, 1, 1]
+    assert len([s for s in statements if s.startswith("SELECT")]) == 2
+
+
+def test_eager_select_raises_with_non_foreign_key_field():
+    with pytest.raises(ValueError):
+        orm.select(Bar).eager("b")
+
+
+def test_joined_select_is_read_with_one_statement(relations_inserted):
+    statements: list[str] = []
+    relations_inserted.set_trace_callback(statements.append)
+    selected_foo = orm.select(Foo).where("Foo.a = ?", (1,))
+    query = orm.select(Bar).join("some_foo", selected_foo).where("Bar.b = 0")
+    assert len(list(query())) == 1
+    assert len([s for s in statements if s.startswith("SELECT")]) == 1
+
+
+def test_joined_foreign_key_is_read_with_results(relations_inserted):
+    statements: list[str] = []
+    relations_inserted.set_trace_callback(statements.append)
+    bars = cast(list[Bar], list(orm.select(Bar).join("some_foo")()))
+    assert sorted(bar.some_foo.a for bar in bars) == [0, 0, 1, 1]
+    assert len([s for s in statements if s.startswith("SELECT")]) == 1
+
+
+def test_foreign_key_joined_to_select_is_read_with_results(relations_inserted):
+    statements: list[str] = []
+    relations_inserted.set_trace_callback(statements.append)
+    query = orm.select(Bar).join("some_foo", orm.select(Foo).where("Foo.a = 1"))
+    bars = cast(list[Bar], list(query()))
+    assert [bar.some_foo.a for bar in bars] == [1, 1]
+    assert len([s for s in statements if s.startswith("SELECT")]) == 1
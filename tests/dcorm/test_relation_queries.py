@@ -1,9 +1,10 @@
 from dataclasses import dataclass
 import pytest
 import sqlite3
-from typing import cast
+from typing import Any, cast
 
 from dcorm import orm
+from dcorm.connection_pool import ConnectionContextMgr
 
 
 @orm.orm_dataclass
@@ -34,35 +35,44 @@ class Registration:
 
 class RegistrationDatabase:
     def __init__(self):
-        pass
-
-    def initialize_tables(self):
-        orm.create(Student, drop_if_exists=True)
-        orm.create(Instructor, drop_if_exists=True)
-        orm.create(Course, drop_if_exists=True)
-        orm.create(Registration, drop_if_exists=True)
+        # Instances are staged and then inserted with a single insert_many().
+        self.staged: list[Any] = []
+
+    def initialize_tables(self, connection: ConnectionContextMgr | None = None):
+        orm.create_all(
+            Student,
+            Instructor,
+            Course,
+            Registration,
+            connection=connection,
+            drop_if_exists=True,
+        )
 
     def create_student(self, name) -> Student:
         student = Student(name)
-        orm.insert(student)
+        self.staged.append(student)
         return student
 
     def create_instructor(self, name) -> Instructor:
         instructor = Instructor(name)
-        orm.insert(instructor)
+        self.staged.append(instructor)
         return instructor
 
     def create_course(self, title, instructor) -> Course:
         course = Course(title, instructor)
-        orm.insert(course)
+        self.staged.append(course)
         return course
 
     def register(self, student: Student, course: Course):
-        orm.insert(Registration(student, course))
+        self.staged.append(Registration(student, course))
 
     def init(self):
-        self.initialize_tables()
+        # The tables and rows are created by a single transaction.
+        with orm.transaction() as transaction:
+            self.initialize_tables(transaction)
+            self.insert_rows(transaction)
 
+    def insert_rows(self, connection: ConnectionContextMgr | None = None):
         alice = self.create_student("Alice")
         bob = self.create_student("Bob")
         charlie = self.create_student("Charlie")
@@ -83,40 +93,87 @@ class RegistrationDatabase:
 
         self.register(charlie, calculus)
 
-
-@pytest.fixture
-def empty_db():
-    connection = sqlite3.connect(":memory:")
-    orm.set_connection_factory(lambda: connection)
-    return connection
+        orm.insert_many(self.staged, connection)
+        self.staged.clear()
 
 
-@pytest.fixture
-def registration_database(empty_db):
-    orm.set_connection_factory(lambda: empty_db)
+@pytest.fixture(scope="session")
+def shared_registration_db():
+    # The registrations are inserted once per session.  The tests only read
+    # them, so they share the one database rather than each getting a copy.
+    # It's made read-only so that a test that writes fails rather than
+    # changing the data for the tests that follow.
+    database = sqlite3.connect(":memory:")
+    orm.set_connection_factory(lambda: database)
     registrations = RegistrationDatabase()
     registrations.init()
-    return empty_db
+    database.execute("PRAGMA query_only = ON")
+    return database
+
+
+@pytest.fixture
+def registration_database(shared_registration_db):
+    # Resetting the factory gives each test an empty identity map.
+    orm.set_connection_factory(lambda: shared_registration_db)
+    return shared_registration_db
 
 
 # Tests for queries involving a relation
 def test_registrations_where_equal_algebra_returns_two(registration_database):
-    orm.set_connection_factory(lambda: registration_database)
     algebra = next(iter(orm.select(Course).where("title = ?", ("Algebra",))()))
-    registrations = orm.select(Registration).where_equal("course", algebra)()
-    assert len(list(registrations)) == 2
+    registrations = orm.select(Registration).where_equal("course", algebra)
+    assert len(list(registrations())) == 2
+    assert registrations.count() == 2
+
+
+def test_where_equal_matches_string_field(registration_database):
+    students = orm.select(Student).where_equal("name", "Alice")()
+    assert [cast(Student, student).name for student in students] == ["Alice"]
+
+
+def test_where_equal_shares_statement_with_where():
+    by_value = orm.select(Student).where_equal("name", "Alice")
+    by_clause = orm.select(Student).where("name = ?", ("Bob",))
+    assert by_value.get_statement() is by_clause.get_statement()
+
+
+def test_where_equal_raises_on_incompatible_type(registration_database):
+    student = next(iter(orm.select(Student)()))
+    with pytest.raises(ValueError):
+        orm.select(Registration).where_equal("course", student)
+
+
+def test_where_equal_raises_on_unknown_attribute():
+    with pytest.raises(ValueError):
+        orm.select(Registration).where_equal("wrong_name", 1)
 
 
 # Tests for queries involving a relation
 def test_registrations_where_with_object_substitution_for_algebra_returns_two(
     registration_database,
 ):
-    orm.set_connection_factory(lambda: registration_database)
     algebra = next(iter(orm.select(Course).where("title = ?", ("Algebra",))()))
     registrations = orm.select(Registration).where("course = ?", (algebra,))()
     assert len(list(registrations)) == 2
 
 
+# The parametrized queries are prepared once per module and run with each
+# case's parameters.
+@pytest.fixture(scope="module")
+def class_list_query():
+    return orm.select(Registration).join("course").where("course.title = ?").prepare()
+
+
+@pytest.fixture(scope="module")
+def student_schedule_query():
+    return orm.select(Registration).join("student").where("student.name = ?").prepare()
+
+
+@pytest.fixture(scope="module")
+def instructor_schedule_query():
+    return orm.select(Course).join("instructor").where("instructor.name = ?").prepare()
+
+
 @pytest.mark.parametrize(
     "course,expected_students",
     [
@@ -125,13 +182,15 @@ def test_registrations_where_with_object_substitution_for_algebra_returns_two(
         ("Calculus", {"Alice", "Charlie"}),
     ],
 )
-def test_class_list_query(registration_database, course, expected_students):
-    orm.set_connection_factory(lambda: registration_database)
-    query = orm.select(Registration).join("course").where("course.title = ?", (course,))
+def test_class_list_query(
+    registration_database, class_list_query, course, expected_students
+):
     class_list = [
-        cast(Registration, registration).student.name for registration in query()
+        cast(Registration, registration).student.name
+        for registration in class_list_query((course,))
     ]
     # Check the length before turning into a set to ensure there are no duplicates.
+    assert len(class_list) == len(expected_students)
     assert set(class_list) == expected_students
 
 
@@ -143,15 +202,15 @@ def test_class_list_query(registration_database, course, expected_students):
         ("Charlie", {"Calculus"}),
     ],
 )
-def test_student_schedule_query(registration_database, student, expected_courses):
-    orm.set_connection_factory(lambda: registration_database)
-    query = (
-        orm.select(Registration).join("student").where("student.name = ?", (student,))
-    )
+def test_student_schedule_query(
+    registration_database, student_schedule_query, student, expected_courses
+):
     class_list = [
-        cast(Registration, registration).course.title for registration in query()
+        cast(Registration, registration).course.title
+        for registration in student_schedule_query((student,))
     ]
     # Check the length before turning into a set to ensure there are no duplicates.
+    assert len(class_list) == len(expected_courses)
     assert set(class_list) == expected_courses
 
 
@@ -162,15 +221,15 @@ def test_student_schedule_query(registration_database, student, expected_courses
         ("Jones", {"Algebra"}),
     ],
 )
-def test_instructor_schedule_query(registration_database, instructor, expected_courses):
-    orm.set_connection_factory(lambda: registration_database)
-    query = (
-        orm.select(Course)
-        .join("instructor")
-        .where("instructor.name = ?", (instructor,))
-    )
-    class_list = [cast(Course, course).title for course in query()]
+def test_instructor_schedule_query(
+    registration_database, instructor_schedule_query, instructor, expected_courses
+):
+    class_list = [
+        cast(Course, course).title
+        for course in instructor_schedule_query((instructor,))
+    ]
     # Check the length before turning into a set to ensure there are no duplicates.
+    assert len(class_list) == len(expected_courses)
     assert set(class_list) == expected_courses
 
 
@@ -184,7 +243,6 @@ def test_instructor_schedule_query(registration_database, instructor, expected_c
 def test_students_having_instructor(
     registration_database, instructor, expected_students
 ):
-    orm.set_connection_factory(lambda: registration_database)
     instructor_courses = (
         orm.select(Course)
         .join("instructor")
@@ -196,3 +254,74 @@ def test_students_having_instructor(
     query = orm.select(Student).join(None, instructor_registrations, "student")
     students = [cast(Student, student).name for student in query()]
     assert set(students) == expected_students
+
+
+def test_values_keeps_results_with_equal_values(registration_database):
+    query = (
+        orm.select(Registration).join("course").where("course.title = ?", ("Algebra",))
+    )
+    assert list(query.values("course.title")) == [("Algebra",), ("Algebra",)]
+
+
+def test_count_of_joined_select(registration_database):
+    query = (
+        orm.select(Registration).join("student").where("student.name = ?", ("Alice",))
+    )
+    assert query.count() == 3
+
+
+def test_count_ignores_rows_repeated_by_join(registration_database):
+    # Each course has two registrations, so the join repeats every course.
+    query = orm.select(Course).join(None, orm.select(Registration), "course")
+    assert len(list(query())) == 3
+    assert query.count() == 3
+
+
+def test_prepared_select_converts_parameters(registration_database):
+    algebra = next(iter(orm.select(Course).where("title = ?", ("Algebra",))()))
+    query = orm.select(Registration).where("course = ?").prepare()
+    assert len(list(query((algebra,)))) == 2
+
+
+def test_shared_registration_db_is_read_only(registration_database):
+    with pytest.raises(sqlite3.OperationalError):
+        orm.insert(Student("Dave"))
+
+
+def test_students_having_instructor_uses_one_statement(registration_database):
+    statements: list[str] = []
+    registration_database.set_trace_callback(statements.append)
+    instructor_courses = (
+        orm.select(Course).join("instructor").where("instructor.name = ?", ("Jones",))
+    )
+    instructor_registrations = orm.select(Registration).join(
+        "course", instructor_courses
+    )
+    query = orm.select(Student).join(None, instructor_registrations, "student")
+    try:
+        assert len(list(query())) == 2
+    finally:
+        registration_database.set_trace_callback(None)
+    assert len([s for s in statements if s.startswith("SELECT")]) == 1
+
+
+def test_values_reads_joined_columns(registration_database):
+    query = (
+        orm.select(Registration)
+        .join("student")
+        .join("course")
+        .where("course.title = ?", ("Algebra",))
+    )
+    rows = list(query.values("student.name", "course.title"))
+    assert sorted(rows) == [("Alice", "Algebra"), ("Bob", "Algebra")]
+    assert {row.student_name for row in rows} == {"Alice", "Bob"}
+
+
+def test_statement_is_shared_by_parameter_values():
+    def schedule(name: str):
+        return (
+            orm.select(Registration).join("student").where("student.name = ?", (name,))
+        )
+
+    # sqlite3 caches prepared statements by their text.
+    assert schedule("Alice").get_statement() is schedule("Bob").get_statement()
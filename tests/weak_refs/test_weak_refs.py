@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 import gc
+import platform
 import pytest
 
 from dcorm.weak_refs import WeakKeyDict
@@ -32,6 +33,14 @@ def test_weak_key_dict_with_object_has_len_one(weak_key_dict, object_one, data_o
     assert len(weak_key_dict) == 1
 
 
+def test_weak_key_dict_accepts_unhashable_key(weak_key_dict, object_one, data_one):
+    with pytest.raises(TypeError):
+        hash(object_one)
+
+    weak_key_dict[object_one] = data_one
+    assert weak_key_dict[object_one] is data_one
+
+
 def test_stored_key_is_in_weak_key_dict(weak_key_dict, object_one, data_one):
     weak_key_dict[object_one] = data_one
     assert object_one in weak_key_dict
@@ -50,8 +59,11 @@ def test_gc_removes_object_reference(weak_key_dict):
 
     assert len(weak_key_dict) == 1
 
+    # CPython runs the weakref callback as soon as the last reference is
+    # dropped.  Other implementations need a collection.
     del f
-    gc.collect()
+    if platform.python_implementation() != "CPython":
+        gc.collect()
 
     assert len(weak_key_dict) == 0
 
@@ -59,3 +71,13 @@ def test_gc_removes_object_reference(weak_key_dict):
 def test_weak_key_dict_raises_key_error_on_unknown_object(weak_key_dict, object_one):
     with pytest.raises(KeyError):
         weak_key_dict[object_one]
+
+
+def test_setdefault_stores_default_for_new_object(weak_key_dict, object_one, data_one):
+    assert weak_key_dict.setdefault(object_one, data_one) is data_one
+    assert weak_key_dict[object_one] is data_one
+
+
+def test_setdefault_returns_existing_value(weak_key_dict, object_one, data_one):
+    weak_key_dict[object_one] = data_one
+    assert weak_key_dict.setdefault(object_one, {}) is data_one